@@ -0,0 +1,266 @@
+"""
+Load-test benchmark for the Flask API.
+
+Starts flask_server.app in-process on a local port, seeds a synthetic
+catalogue, drives every /api/v1 route with concurrent clients and writes
+throughput, p50/p95/p99 latency and responses by status code per route
+as JSON so runs can be compared across commits. Any status other than 200
+is counted as an error.
+
+    # against a local mongod (uses the btm_workout_bench database, which is wiped);
+    # the catalogue comes from database_seeder's synthetic generator
+    python benchmarks/bench_api.py --size 10000 --concurrency 16
+
+    # against an in-memory backend (needs `pip install mongomock`)
+    python benchmarks/bench_api.py --backend mongomock --size 1000
+
+/api/v1/refresh_db is not driven because it calls the external ExerciseDB API.
+mongomock has no $text, so GET /api/v1/search only gives numbers against mongod.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from database_seeder import SYNTHETIC_BODY_PARTS, SYNTHETIC_EQUIPMENT, SYNTHETIC_MOVEMENTS, generate_exercises  # noqa: E402
+
+BENCH_DB = "btm_workout_bench"
+# Exercises per POST /api/v1/exercises/bulk request
+BENCH_BULK_SIZE = 50
+# /api/v1/metrics needs a bearer token; the other routes ignore the header
+BENCH_METRICS_TOKEN = "bench"
+BENCH_HEADERS = {"Accept-Encoding": "gzip, br", "Authorization": f"Bearer {BENCH_METRICS_TOKEN}"}
+# Every driven route answers 200 on success; any other status counts as an error
+BENCH_EXPECTED_STATUS = 200
+def setup_backend(args):
+    """Points btm_workout_db_connect at the benchmark database and returns it."""
+    import btm_workout_db_connect
+
+    if args.backend == "mongomock":
+        import mongomock
+
+        client = mongomock.MongoClient()
+        manager = btm_workout_db_connect.manager
+        manager.client = client
+        manager.db = client[BENCH_DB]
+        manager.healthy = True
+        return manager.db
+
+    os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["MONGO_DB"] = BENCH_DB
+    btm_workout_db_connect.connect_db()
+    db = btm_workout_db_connect.get_db()
+    if db is None:
+        sys.exit(f"Could not connect to {args.mongo_uri}")
+    return db
+
+
+def seed_catalogue(db, size):
+    from database_seeder import seed_synthetic_catalogue
+    from database_setup import create_initial_collections_and_indexes
+
+    db.body_parts.delete_many({})
+    db.equipment.delete_many({})
+    db.meta.delete_many({})
+    create_initial_collections_and_indexes()
+    seed_synthetic_catalogue(size)
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+
+    # Per-request access logs would dominate the benchmark's own output
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def build_scenarios(names, run_id):
+    """Returns [(label, method, path(i, rng), body(i, rng))] in the order they must run."""
+    body_parts = list(SYNTHETIC_BODY_PARTS)
+
+    def any_name(i, rng):
+        return rng.choice(names)
+
+    def bench_exercise(i, rng):
+        return {"name": f"bench {run_id} {i}", "bodyPart": "bench", "equipment": "bench", "target": "bench"}
+
+    def bulk_names(i):
+        return [f"bench bulk {run_id} {i} {j}" for j in range(BENCH_BULK_SIZE)]
+
+    def bulk_exercises(i, rng):
+        return [{"name": name, "bodyPart": "bench", "equipment": "bench", "target": "bench"} for name in bulk_names(i)]
+
+    def query_path(i, rng):
+        params = {"bodyPart": rng.choice(body_parts), "equipment": rng.choice(SYNTHETIC_EQUIPMENT), "limit": 50}
+        return f"/api/v1/exercises/query?{urlencode(params)}"
+
+    def autocomplete_path(i, rng):
+        # A 3 to 8 character prefix of a catalogue name, as typed
+        return f"/api/v1/autocomplete?{urlencode({'prefix': any_name(i, rng)[:rng.randint(3, 8)]})}"
+
+    return [
+        ("GET /api/v1/health", "GET", lambda i, rng: "/api/v1/health", None),
+        ("GET /api/v1/body_parts_list", "GET", lambda i, rng: "/api/v1/body_parts_list", None),
+        ("GET /api/v1/equipment_list", "GET", lambda i, rng: "/api/v1/equipment_list", None),
+        ("GET /api/v1/difficulties", "GET", lambda i, rng: "/api/v1/difficulties", None),
+        ("GET /api/v1/exercise/<name>", "GET", lambda i, rng: f"/api/v1/exercise/{any_name(i, rng)}", None),
+        ("GET /api/v1/exercises_list", "GET", lambda i, rng: "/api/v1/exercises_list", None),
+        ("GET /api/v1/exercises_list?limit=50", "GET", lambda i, rng: "/api/v1/exercises_list?limit=50", None),
+        ("GET /api/v1/exercises/query", "GET", query_path, None),
+        ("GET /api/v1/bootstrap", "GET", lambda i, rng: "/api/v1/bootstrap", None),
+        ("GET /api/v1/search", "GET", lambda i, rng: f"/api/v1/search?{urlencode({'q': rng.choice(SYNTHETIC_MOVEMENTS)})}", None),
+        ("GET /api/v1/autocomplete", "GET", autocomplete_path, None),
+        ("POST /api/v1/get_random_exercises", "POST", lambda i, rng: "/api/v1/get_random_exercises",
+         lambda i, rng: {"bodyPart": rng.choice(body_parts), "numExercises": 4}),
+        ("POST /api/v1/insert_exercise", "POST", lambda i, rng: "/api/v1/insert_exercise", bench_exercise),
+        ("DELETE /api/v1/delete_exercise/<name>", "DELETE", lambda i, rng: f"/api/v1/delete_exercise/bench {run_id} {i}", None),
+        (f"POST /api/v1/exercises/bulk ({BENCH_BULK_SIZE} items)", "POST", lambda i, rng: "/api/v1/exercises/bulk",
+         bulk_exercises),
+        ("POST /api/v1/exercises/bulk_delete dry_run", "POST", lambda i, rng: "/api/v1/exercises/bulk_delete",
+         lambda i, rng: {"filter": {"bodyPart": rng.choice(body_parts)}, "dry_run": True}),
+        # Deletes what the bulk scenario inserted
+        (f"POST /api/v1/exercises/bulk_delete ({BENCH_BULK_SIZE} names)", "POST", lambda i, rng: "/api/v1/exercises/bulk_delete",
+         lambda i, rng: {"names": bulk_names(i)}),
+        ("POST /api/v1/add_body_part", "POST", lambda i, rng: "/api/v1/add_body_part",
+         lambda i, rng: {"name": f"bench-part-{run_id}-{i}"}),
+        ("DELETE /api/v1/delete_body_part/<name>", "DELETE", lambda i, rng: f"/api/v1/delete_body_part/bench-part-{run_id}-{i}", None),
+        ("POST /api/v1/add_equipment", "POST", lambda i, rng: "/api/v1/add_equipment",
+         lambda i, rng: {"name": f"bench-equipment-{run_id}-{i}"}),
+        ("DELETE /api/v1/delete_equipment/<name>", "DELETE", lambda i, rng: f"/api/v1/delete_equipment/bench-equipment-{run_id}-{i}", None),
+        ("GET /api/v1/metrics", "GET", lambda i, rng: "/api/v1/metrics", None),
+    ]
+
+
+def run_scenario(base_url, method, path_fn, body_fn, total, concurrency):
+    """
+    Sends total requests over concurrency threads; returns (latencies_ms,
+    errors, statuses, wall_seconds). statuses counts responses by status
+    code, with "exception" for requests that got no response.
+    """
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        rng = random.Random(i)
+        body = body_fn(i, rng) if body_fn else None
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path_fn(i, rng), json=body,
+                                       headers=BENCH_HEADERS, timeout=60)
+            response.content  # read the whole body
+            status = str(response.status_code)
+        except requests.RequestException:
+            status = "exception"
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items() if status != str(BENCH_EXPECTED_STATUS))
+    return latencies, errors, dict(sorted(statuses.items())), wall
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[index], 3)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["mongod", "mongomock"], default="mongod")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI", "mongodb://127.0.0.1:27017"))
+    parser.add_argument("--size", type=int, default=1000, help="synthetic catalogue size")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--list-requests", type=int, default=20, help="requests for the full exercises_list route")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    db = setup_backend(args)
+    seed_catalogue(db, args.size)
+    names = [exercise["name"] for exercise in generate_exercises(0, args.size)]
+
+    os.environ["METRICS_TOKEN"] = BENCH_METRICS_TOKEN
+    from flask_server import app
+
+    server, base_url = start_server(app)
+    run_id = int(time.time())
+    results = []
+    try:
+        for label, method, path_fn, body_fn in build_scenarios(names, run_id):
+            total = args.list_requests if label == "GET /api/v1/exercises_list" else args.requests
+            latencies, errors, statuses, wall = run_scenario(base_url, method, path_fn, body_fn, total, args.concurrency)
+            latencies.sort()
+            result = {
+                "route": label,
+                "requests": total,
+                "errors": errors,
+                "statuses": statuses,
+                "throughput_rps": round(total / wall, 1),
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+            }
+            results.append(result)
+            print(f"{label:50} {result['throughput_rps']:>9} req/s  p50 {result['p50_ms']:>9} ms  "
+                  f"p95 {result['p95_ms']:>9} ms  p99 {result['p99_ms']:>9} ms  errors {errors}"
+                  + (f"  statuses {statuses}" if errors else ""))
+    finally:
+        server.shutdown()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "backend": args.backend,
+        "catalogue_size": args.size,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        REPO_ROOT, "benchmarks", "results",
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
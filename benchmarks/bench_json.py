@@ -0,0 +1,50 @@
+"""
+Serialization micro-benchmark: Flask's default JSON provider versus
+btm_workout_json.FastJSONProvider on a synthetic catalogue.
+
+    python benchmarks/bench_json.py --size 5000 --rounds 20
+"""
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+import btm_workout_json  # noqa: E402
+from btm_workout_json import FastJSONProvider  # noqa: E402
+from database_seeder import generate_exercises  # noqa: E402
+
+
+def time_response(provider, app, exercises, rounds):
+    with app.app_context():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            body = provider.response(exercises).get_data()
+        return (time.perf_counter() - started) / rounds * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    exercises = generate_exercises(0, args.size)
+    app = Flask(__name__)
+    providers = [("flask default (stdlib json)", DefaultJSONProvider(app))]
+    if btm_workout_json.orjson is not None:
+        providers.append(("FastJSONProvider (orjson)", FastJSONProvider(app)))
+    else:
+        print("orjson is not installed; FastJSONProvider would use the stdlib encoder.")
+
+    for label, provider in providers:
+        ms, size = time_response(provider, app, exercises, args.rounds)
+        print(f"{label:30} {ms:9.2f} ms per response  ({size} bytes, {args.size} exercises)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from btm_workout_db_connect import get_db
+
+
+class TTLCache:
+    """
+    Small thread-safe cache with a per-entry time-to-live and an LRU size bound.
+
+    Each gunicorn worker holds its own copy, so the TTL is also the upper bound
+    on how stale another worker's entry can be after a write.
+    """
+
+    def __init__(self, ttl=300, maxsize=128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for key, calling loader() to fill it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+# Distinct bodyPart / equipment / difficulty lists shown in the client dropdowns
+taxonomy_cache = TTLCache(
+    ttl=float(os.getenv("TAXONOMY_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("TAXONOMY_CACHE_SIZE", "32")),
+)
+
+
+# --- Catalogue version ---
+# A counter in the meta collection that every exercise write bumps. It backs
+# the ETags of the read endpoints. Each worker re-reads it at most every
+# CATALOGUE_VERSION_TTL seconds, so conditional requests are usually answered
+# without a database round trip. The meta doc also holds an epoch, an
+# ObjectId set when the doc is created, so a counter that restarts after the
+# doc is deleted (or in another database) never repeats an earlier version.
+CATALOGUE_VERSION_ID = "exercises_version"
+CATALOGUE_VERSION_TTL = float(os.getenv("CATALOGUE_VERSION_TTL", "5"))
+
+_catalogue_version = None
+_catalogue_version_checked_at = 0.0
+_catalogue_version_lock = threading.Lock()
+
+
+class CatalogueVersion(namedtuple("CatalogueVersion", ["epoch", "number"])):
+    """str(version) is the token used in ETags, snapshot file names and the bootstrap payload."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.epoch}-{self.number}"
+
+
+def _set_catalogue_version(version):
+    global _catalogue_version, _catalogue_version_checked_at
+    _catalogue_version = version
+    _catalogue_version_checked_at = time.monotonic()
+
+
+def _ensure_version_doc(db):
+    """Creates the meta doc, or adds the epoch to one written before epochs existed, and returns it."""
+    try:
+        db.meta.update_one(
+            {"_id": CATALOGUE_VERSION_ID, "epoch": {"$exists": False}},
+            {"$set": {"epoch": ObjectId()}, "$setOnInsert": {"version": 0}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Another process created it (with an epoch) first
+        pass
+    return db.meta.find_one({"_id": CATALOGUE_VERSION_ID})
+
+
+def catalogue_version_from_doc(doc):
+    return CatalogueVersion(str(doc["epoch"]), doc.get("version", 0))
+
+
+def get_catalogue_version(db):
+    """Returns the current catalogue version, reading it from MongoDB only when the local copy has expired."""
+    if _catalogue_version is not None and time.monotonic() - _catalogue_version_checked_at < CATALOGUE_VERSION_TTL:
+        return _catalogue_version
+    with _catalogue_version_lock:
+        doc = db.meta.find_one({"_id": CATALOGUE_VERSION_ID})
+        if doc is None or "epoch" not in doc:
+            doc = _ensure_version_doc(db)
+        _set_catalogue_version(catalogue_version_from_doc(doc))
+        return _catalogue_version
+
+
+def bump_catalogue_version(db):
+    doc = db.meta.find_one_and_update(
+        {"_id": CATALOGUE_VERSION_ID},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": ObjectId()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if "epoch" not in doc:
+        doc = _ensure_version_doc(db)
+    version = catalogue_version_from_doc(doc)
+    with _catalogue_version_lock:
+        _set_catalogue_version(version)
+    return version
+
+
+def cached_distinct(db, field, replica=None):
+    """
+    Cached db.exercises.distinct(field), keyed by catalogue version so other workers' writes are picked up.
+    Read from replica (a CatalogueReplica) instead when it has applied that version.
+    """
+    version = get_catalogue_version(db)
+    return taxonomy_cache.get_or_load(
+        (field, version),
+        lambda: replica.distinct(field) if replica is not None and replica.ready_for(version) else db.exercises.distinct(field),
+    )
+
+
+class CatalogueIndex:
+    """
+    Base for the per-process in-memory indexes built from db.exercises.
+
+    The index remembers the catalogue version it was built at. Reads call
+    ensure_current() first: the first call in a process loads synchronously,
+    and after that a changed catalogue version (another worker's write) or
+    invalidate() starts a single background reload while reads keep using the
+    current copy. Subclasses implement load(db) and swap their data in under
+    their own lock.
+    """
+
+    def __init__(self):
+        self._built_version = None
+        self._stale = False
+        self._reloading = False
+        self._state_lock = threading.Lock()
+        self._first_load_lock = threading.Lock()
+
+    def loaded(self):
+        return self._built_version is not None
+
+    def load(self, db):
+        raise NotImplementedError
+
+    def reload(self, db):
+        """Rebuilds the index now. The version is read first, so a write during the load causes another reload."""
+        self._stale = False
+        version = get_catalogue_version(db)
+        self.load(db)
+        self._built_version = version
+
+    def invalidate(self):
+        """Schedules a background reload on the next read."""
+        self._stale = True
+
+    def advance(self, version):
+        """
+        Called after this worker applied its own write to the index; version is
+        what invalidate_exercise_caches() returned for that write. If the index
+        was current just before that bump it is current now, so only other
+        workers' writes cause a reload.
+        """
+        built = self._built_version
+        if (
+            version is not None and built is not None
+            and built.epoch == version.epoch and built.number == version.number - 1
+        ):
+            self._built_version = version
+
+    def ensure_current(self, db):
+        """Returns True if the index is current, False if a background reload is due or running."""
+        if self._built_version is None:
+            with self._first_load_lock:
+                if self._built_version is None:
+                    self.reload(db)
+            return True
+        if self._stale or get_catalogue_version(db) != self._built_version:
+            self._reload_in_background(db)
+            return False
+        return True
+
+    def _reload_in_background(self, db):
+        with self._state_lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._background_reload, args=(db,), name=f"{type(self).__name__}-reload", daemon=True).start()
+
+    def _background_reload(self, db):
+        try:
+            self.reload(db)
+        except PyMongoError as e:
+            print(f"{type(self).__name__} reload failed: {e}")
+            self._stale = True
+        finally:
+            self._reloading = False
+
+
+def invalidate_exercise_caches():
+    """
+    Must be called after anything that inserts, updates or deletes exercises.
+    Returns the new catalogue version, or None if it could not be bumped.
+    """
+    global _catalogue_version
+    taxonomy_cache.clear()
+    db = get_db()
+    try:
+        if db is None:
+            raise PyMongoError("Database not connected.")
+        return bump_catalogue_version(db)
+    except PyMongoError as e:
+        # Without a new version, drop the local copy so the next read re-checks MongoDB
+        print(f"Failed to bump catalogue version: {e}")
+        _catalogue_version = None
+        return None
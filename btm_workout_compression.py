@@ -0,0 +1,64 @@
+import gzip
+import os
+from flask import request
+from btm_workout_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/html", "text/plain"}
+
+# Preferred first
+CONTENT_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Compressed bodies of ETag-tagged responses, keyed by (URL, encoding, ETag).
+# A new catalogue version means a new ETag, so stale entries are never served.
+compressed_cache = TTLCache(
+    ttl=float(os.getenv("COMPRESS_CACHE_TTL", "3600")),
+    maxsize=int(os.getenv("COMPRESS_CACHE_SIZE", "32")),
+)
+
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL)
+
+
+def compress_response(response):
+    """after_request hook: compresses large JSON/text bodies with the client's preferred encoding."""
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or "Content-Encoding" in response.headers:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(CONTENT_ENCODINGS)
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    key = (request.full_path, encoding, etag) if etag else None
+    compressed = compressed_cache.get(key) if key else None
+    if compressed is None:
+        compressed = compress_body(response.get_data(), encoding)
+        if key:
+            compressed_cache.set(key, compressed)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        # Each encoding is a different representation, so it gets its own strong ETag
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def etag_variants(etag):
+    """The ETag plus its per-encoding variants, as set by compress_response."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in CONTENT_ENCODINGS]
@@ -1,74 +1,241 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import PyMongoError
 
 db = None
 client = None
 
-def connect_db():
-    global db, client
-    # Load .env file variables immediately
-    load_dotenv()
-    
+
+def _build_mongo_uri():
+    """Returns (uri, db_name) from the environment, or (None, db_name) if it is incomplete."""
     # 1. Define the database name (default used if not set)
     MONGO_DB = os.getenv("MONGO_DB", "btm_workout_db")
-    
+
     # 2. Check for single MONGO_URI (Used for Atlas/Deployment)
     MONGO_URI_ATLAS = os.getenv("MONGO_URI")
 
     if MONGO_URI_ATLAS:
         # Priority 1: Use the Atlas URI directly
-        FINAL_MONGO_URI = MONGO_URI_ATLAS
         print("Connecting with MONGO_URI (Atlas/Deployment).")
-    else:
-        # Priority 2: Fallback: Build URI from components (Used for Local Development)
-        MONGO_USER = os.getenv("MONGO_USER")
-        MONGO_PASS = os.getenv("MONGO_PASS")
-        MONGO_HOST = os.getenv("MONGO_HOST")
-
-        if not all([MONGO_USER, MONGO_PASS, MONGO_HOST]):
-            print("❌ Error: Cannot connect. Missing required local environment variables (MONGO_USER, etc.).")
+        return MONGO_URI_ATLAS, MONGO_DB
+
+    # Priority 2: Fallback: Build URI from components (Used for Local Development)
+    MONGO_USER = os.getenv("MONGO_USER")
+    MONGO_PASS = os.getenv("MONGO_PASS")
+    MONGO_HOST = os.getenv("MONGO_HOST")
+
+    if not all([MONGO_USER, MONGO_PASS, MONGO_HOST]):
+        print("❌ Error: Cannot connect. Missing required local environment variables (MONGO_USER, etc.).")
+        return None, MONGO_DB
+
+    encoded_password = quote_plus(MONGO_PASS)
+    # Assumes default MongoDB port 27017 for local connections
+    print(f"Connecting with Local URI: {MONGO_HOST}")
+    return f"mongodb://{MONGO_USER}:{encoded_password}@{MONGO_HOST}:27017/{MONGO_DB}", MONGO_DB
+
+
+# MongoClient pool settings, read from the environment. Unset values keep pymongo's defaults.
+POOL_OPTION_ENV = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+}
+
+
+def mongo_client_options():
+    """Returns the MongoClient keyword arguments configured through the environment."""
+    options = {"serverSelectionTimeoutMS": 5000}
+    for option, env_name in POOL_OPTION_ENV.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = int(value)
+    # e.g. MONGO_COMPRESSORS=zstd,snappy,zlib (zstd needs zstandard, snappy needs python-snappy)
+    compressors = os.getenv("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+class ConnectionManager:
+    """
+    Owns the process-wide MongoClient.
+
+    One client is created per process and kept for its lifetime: pymongo
+    re-establishes dropped connections by itself, so replacing the client
+    would only fail in-flight operations and discard the warm pool. The
+    request path only hands out the cached database handle. A background
+    thread pings every MONGO_HEALTH_INTERVAL seconds (0 disables it) and
+    records the outcome for the health and metrics routes.
+    """
+
+    def __init__(self, health_interval=None):
+        if health_interval is None:
+            health_interval = float(os.getenv("MONGO_HEALTH_INTERVAL", "30"))
+        self.health_interval = health_interval
+        self.client = None
+        self.db = None
+        self.healthy = False
+        self.last_ping_at = None
+        self.last_ping_latency_ms = None
+        self.last_error = None
+        self.failed_ping_count = 0
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def connect(self):
+        """Creates the MongoClient if there is none yet and records one ping."""
+        with self._lock:
+            if self.client is not None:
+                return self.db
+
+            # Load .env file variables immediately
+            load_dotenv()
+            uri, db_name = _build_mongo_uri()
+            if uri is None:
+                return None
+
+            try:
+                # MongoClient connects lazily; a server that is down now is retried by pymongo later
+                self.client = MongoClient(uri, **mongo_client_options())
+                self.db = self.client.get_database(db_name)
+            except Exception as e:
+                # Malformed URI or options; nothing to retry
+                print(f"An unexpected error occurred: {e}")
+                self.last_error = str(e)
+                self.client = None
+                self.db = None
+                return None
+
+        if self.ping():
+            print(f"✅ Successfully connected to MongoDB database: {db_name}")
+        else:
+            # Handles Atlas firewall block or local server being down
+            print(f"❌ Error: Could not reach MongoDB. Check Atlas Firewall status or local server. Error: {self.last_error}")
+        self._start_monitor()
+        return self.db
+
+    def get_db(self):
+        """Returns the cached database handle, creating the client only if there is none."""
+        if self.db is not None:
+            return self.db
+        return self.connect()
+
+    def ping(self):
+        """Runs one ping round trip and records its outcome. Returns True if it succeeded."""
+        client = self.client
+        if client is None:
+            return False
+        started = time.perf_counter()
+        try:
+            client.admin.command('ping')
+        except PyMongoError as e:
+            self.healthy = False
+            self.last_error = str(e)
+            self.failed_ping_count += 1
+            return False
+        self.last_ping_latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.last_ping_at = time.time()
+        self.last_error = None
+        self.healthy = True
+        return True
+
+    def prewarm(self, connections=None):
+        """
+        Opens pooled connections ahead of traffic by running that many pings
+        concurrently, so the first burst of requests does not pay for TLS
+        handshakes. Defaults to MONGO_PREWARM_CONNECTIONS, then MONGO_MIN_POOL_SIZE.
+        """
+        if connections is None:
+            connections = int(os.getenv("MONGO_PREWARM_CONNECTIONS") or os.getenv("MONGO_MIN_POOL_SIZE") or 0)
+        client = self.client
+        if client is None or connections <= 0:
+            return 0
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
+        return connections
+
+    def status(self):
+        """Returns the tracked connection state without touching the network."""
+        return {
+            "connected": self.client is not None,
+            "healthy": self.healthy,
+            "last_ping_at": self.last_ping_at,
+            "last_ping_latency_ms": self.last_ping_latency_ms,
+            "failed_ping_count": self.failed_ping_count,
+            "last_error": self.last_error,
+        }
+
+    def reset_after_fork(self):
+        """
+        Drops the state inherited from the parent process. MongoClient is not
+        fork-safe, so a forked worker must build its own client instead of
+        using (or closing) the parent's sockets.
+        """
+        self.client = None
+        self.db = None
+        self.healthy = False
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def _start_monitor(self):
+        if self.health_interval <= 0:
             return
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._monitor = threading.Thread(target=self._monitor_loop, name="mongo-health", daemon=True)
+        self._monitor.start()
 
-        encoded_password = quote_plus(MONGO_PASS)
-        # Assumes default MongoDB port 27017 for local connections
-        FINAL_MONGO_URI = f"mongodb://{MONGO_USER}:{encoded_password}@{MONGO_HOST}:27017/{MONGO_DB}"
-        print(f"Connecting with Local URI: {MONGO_HOST}")
+    def _monitor_loop(self):
+        # Only records health; pymongo handles reconnecting
+        while True:
+            time.sleep(self.health_interval)
+            self.ping()
+
+
+manager = ConnectionManager()
+
+
+def connect_db():
+    global db, client
+    manager.connect()
+    db = manager.db
+    client = manager.client
 
-    try:
-        # Attempt connection using the determined URI
-        client = MongoClient(FINAL_MONGO_URI, serverSelectionTimeoutMS=5000)
-        client.admin.command('ping')
-        
-        db = client.get_database(MONGO_DB) 
-        print(f"✅ Successfully connected to MongoDB database: {MONGO_DB}")
-        
-    except ConnectionFailure as e:
-        # Handles Atlas firewall block or local server being down
-        print(f"❌ Error: Could not connect to MongoDB. Check Atlas Firewall status or local server. Error: {e}")
-        db = None
-        client = None
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        db = None
-        client = None
 
 def get_db():
     global db, client
-    if client is not None:
-        try:
-            # Check if the connection is still alive with a ping
-            client.admin.command('ping')
-            return db
-        except ConnectionFailure:
-            print("Connection dropped. Reconnecting...")
-            db = None
-            client = None
-    
-    # Reconnect if db is None or if the ping failed
-    if db is None:
-        connect_db()
-    
+    db = manager.get_db()
+    client = manager.client
     return db
+
+
+def reset_after_fork():
+    global db, client
+    manager.reset_after_fork()
+    db = None
+    client = None
+
+
+def prewarm_connections(connections=None):
+    try:
+        warmed = manager.prewarm(connections)
+        if warmed:
+            print(f"✅ Pre-warmed {warmed} MongoDB connections.")
+    except PyMongoError as e:
+        print(f"❌ Error: Could not pre-warm MongoDB connections: {e}")
+
+
+# A forked child must never reuse the parent's MongoClient sockets
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def connection_status():
+    return manager.status()
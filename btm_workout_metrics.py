@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+# With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it) every worker
+# writes its samples to files in that directory and the metrics route merges
+# all of them, whichever worker serves the scrape. Without it, as under
+# `python flask_server.py`, only the current process is reported.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Upper bounds (seconds / bytes) of the histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Worker-local state (cache stats, connection health) is copied into gauges at most this often
+WORKER_GAUGE_INTERVAL = 5.0
+
+request_latency = Histogram(
+    "btm_http_request_duration_seconds", "Time spent handling a request, by route.",
+    ["route", "method", "status"], buckets=LATENCY_BUCKETS)
+request_db_time = Histogram(
+    "btm_http_request_db_seconds", "MongoDB command time spent inside a request, by route.",
+    ["route", "method"], buckets=LATENCY_BUCKETS)
+response_size = Histogram(
+    "btm_http_response_size_bytes", "Response body size as sent (after compression), by route.",
+    ["route", "method"], buckets=SIZE_BUCKETS)
+mongo_command_latency = Histogram(
+    "btm_mongodb_command_duration_seconds", "MongoDB command round-trip time, by command.",
+    ["command", "outcome"], buckets=LATENCY_BUCKETS)
+
+# In multiprocess mode each gauge is combined over the live workers as its multiprocess_mode says
+cache_hits = Gauge("btm_cache_hits_total", "Cache hits, summed over workers.", ["cache"], multiprocess_mode="livesum")
+cache_misses = Gauge("btm_cache_misses_total", "Cache misses, summed over workers.", ["cache"], multiprocess_mode="livesum")
+cache_entries = Gauge("btm_cache_entries", "Entries currently cached, summed over workers.", ["cache"], multiprocess_mode="livesum")
+mongo_healthy = Gauge(
+    "btm_mongodb_healthy", "1 if the last MongoDB health check succeeded in every worker.", multiprocess_mode="livemin")
+mongo_last_ping = Gauge(
+    "btm_mongodb_last_ping_seconds", "Latency of the last background ping, slowest worker.", multiprocess_mode="livemax")
+mongo_last_ping_at = Gauge(
+    "btm_mongodb_last_ping_timestamp_seconds", "Unix time of the last successful ping, oldest worker.",
+    multiprocess_mode="livemin")
+mongo_failed_pings = Gauge(
+    "btm_mongodb_failed_pings_total", "Failed background pings since the workers started.", multiprocess_mode="livesum")
+
+# Per-thread (per-greenlet under gevent) MongoDB time of the request being handled
+_request_state = threading.local()
+
+_sources = {"caches": {}, "connection_status": None}
+_gauges_updated_at = 0.0
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Records every MongoDB command's duration and charges it to the current request."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        mongo_command_latency.labels(event.command_name, outcome).observe(seconds)
+        if getattr(_request_state, "db_seconds", None) is not None:
+            _request_state.db_seconds += seconds
+
+
+# Must be registered before any MongoClient is created
+monitoring.register(CommandTimingListener())
+
+
+def update_worker_gauges(force=False):
+    """Copies this worker's cache stats and connection state into the gauges."""
+    global _gauges_updated_at
+    now = time.monotonic()
+    if not force and now - _gauges_updated_at < WORKER_GAUGE_INTERVAL:
+        return
+    _gauges_updated_at = now
+
+    for name, cache in _sources["caches"].items():
+        stats = cache.stats()
+        cache_hits.labels(name).set(stats["hits"])
+        cache_misses.labels(name).set(stats["misses"])
+        cache_entries.labels(name).set(stats["size"])
+
+    if _sources["connection_status"] is not None:
+        connection = _sources["connection_status"]()
+        mongo_healthy.set(int(bool(connection.get("healthy"))))
+        if connection.get("last_ping_latency_ms") is not None:
+            mongo_last_ping.set(connection["last_ping_latency_ms"] / 1000)
+        if connection.get("last_ping_at") is not None:
+            mongo_last_ping_at.set(connection["last_ping_at"])
+        mongo_failed_pings.set(connection.get("failed_ping_count") or 0)
+
+
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+    _request_state.db_seconds = 0.0
+
+
+def record_request_metrics(response):
+    """after_request hook. Streamed bodies are timed up to the first byte and have no recorded size."""
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_latency.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - started)
+    request_db_time.labels(route, request.method).observe(_request_state.db_seconds)
+    _request_state.db_seconds = None
+    if not response.is_streamed and response.content_length is not None:
+        response_size.labels(route, request.method).observe(response.content_length)
+    # Every worker serves requests, so this keeps each one's gauges current for the merged scrape
+    update_worker_gauges()
+    return response
+
+
+def init_metrics(app, caches=None, connection_status=None):
+    """
+    caches: {name: TTLCache}; connection_status: callable returning the dict
+    from btm_workout_db_connect.connection_status().
+    """
+    _sources["caches"] = dict(caches or {})
+    _sources["connection_status"] = connection_status
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+
+
+def render_metrics():
+    """Returns (body, content type) in the Prometheus text format."""
+    update_worker_gauges(force=True)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from pymongo.errors import PyMongoError
+from btm_workout_db_connect import get_db
+from btm_workout_cache import CATALOGUE_VERSION_ID, CatalogueVersion, catalogue_version_from_doc
+
+# Optional per-worker copy of the exercises collection, kept current by a
+# change stream. Needs a replica set (Atlas, or a local single-node one).
+CATALOGUE_REPLICA_ENABLED = os.getenv("CATALOGUE_REPLICA", "0") == "1"
+# A change older than this means the stream has fallen behind; reads go back to MongoDB until resynced
+CATALOGUE_REPLICA_MAX_LAG = float(os.getenv("CATALOGUE_REPLICA_MAX_LAG", "30"))
+CATALOGUE_REPLICA_RETRY_SECONDS = float(os.getenv("CATALOGUE_REPLICA_RETRY_SECONDS", "10"))
+# How long one wait on the stream blocks before the loop checks for stop()
+REPLICA_AWAIT_MS = 1000
+REPLICA_LOAD_BATCH = 500
+# The stream follows the catalogue and the meta doc holding its version
+REPLICA_COLLECTIONS = ["exercises", "meta"]
+
+
+class CatalogueReplica:
+    """
+    In-memory replica of db.exercises for the read routes.
+
+    A background thread opens a change stream, loads the collection, then
+    applies every insert, update, replace and delete from the stream. The
+    stream is opened before the load, so nothing written during the load is
+    missed; changes seen twice are idempotent. Until the first load finishes,
+    after a stream error, or when the stream is more than
+    CATALOGUE_REPLICA_MAX_LAG seconds behind, ready() is False so callers read
+    from MongoDB, and the thread resyncs from scratch.
+
+    The stream also carries the catalogue version doc from meta. Writers bump
+    it after their exercise writes, so once the replica has applied version N
+    it holds every write made before N. Callers check ready_for() with the
+    version they tag the response with, so a replica that is behind is never
+    cached or ETagged under a version it has not reached.
+    """
+
+    def __init__(self):
+        self._docs = {}     # _id -> exercise without _id
+        self._by_name = {}  # name -> {_id, ...}
+        self._lock = threading.Lock()
+        self._synced = False
+        self._version = None  # CatalogueVersion applied so far, None if unknown
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_change_at = None
+        self.lag_seconds = None
+        self.resync_count = 0
+        self.last_error = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalogue-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._synced = False
+
+    def ready(self):
+        return self._synced
+
+    def ready_for(self, version):
+        """True if the replica is synced and has applied at least version."""
+        applied = self._version
+        return (
+            self._synced and applied is not None
+            and applied.epoch == version.epoch and applied.number >= version.number
+        )
+
+    # --- Reads (only valid while ready()) ---
+
+    def exercises(self):
+        """All exercises without _id. The dicts are shared; callers must not modify them."""
+        with self._lock:
+            return list(self._docs.values())
+
+    def find_by_name(self, name):
+        with self._lock:
+            ids = self._by_name.get(name)
+            if not ids:
+                return None
+            return dict(self._docs[next(iter(ids))])
+
+    def find_by_ids(self, ids):
+        """Copies of the exercises with these _ids, _id included as from db.exercises.find."""
+        with self._lock:
+            return [dict(self._docs[doc_id], _id=doc_id) for doc_id in ids if doc_id in self._docs]
+
+    def distinct(self, field):
+        with self._lock:
+            values = {doc.get(field) for doc in self._docs.values()}
+        values.discard(None)
+        return sorted(values, key=str)
+
+    def status(self):
+        return {
+            "enabled": True,
+            "ready": self._synced,
+            "version": str(self._version) if self._version is not None else None,
+            "documents": len(self._docs),
+            "lag_seconds": self.lag_seconds,
+            "last_change_at": self.last_change_at,
+            "resync_count": self.resync_count,
+            "last_error": self.last_error,
+        }
+
+    # --- Sync ---
+
+    def _put(self, doc):
+        doc = dict(doc)
+        doc_id = doc.pop("_id")
+        with self._lock:
+            self._unindex(doc_id)
+            self._docs[doc_id] = doc
+            self._by_name.setdefault(doc.get("name"), set()).add(doc_id)
+
+    def _delete(self, doc_id):
+        with self._lock:
+            self._unindex(doc_id)
+            self._docs.pop(doc_id, None)
+
+    def _unindex(self, doc_id):
+        old = self._docs.get(doc_id)
+        if old is None:
+            return
+        ids = self._by_name.get(old.get("name"))
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del self._by_name[old.get("name")]
+
+    def _set_version(self, doc):
+        # A doc without an epoch predates epochs; get_catalogue_version adds one, which arrives as a change
+        self._version = catalogue_version_from_doc(doc) if doc is not None and "epoch" in doc else None
+
+    def _load(self, db):
+        # The version is read first, so the documents loaded include every write made before it
+        self._set_version(db.meta.find_one({"_id": CATALOGUE_VERSION_ID}))
+        docs, by_name = {}, {}
+        for doc in db.exercises.find({}, batch_size=REPLICA_LOAD_BATCH):
+            doc_id = doc.pop("_id")
+            docs[doc_id] = doc
+            by_name.setdefault(doc.get("name"), set()).add(doc_id)
+        with self._lock:
+            self._docs = docs
+            self._by_name = by_name
+
+    def _apply_version_change(self, change):
+        operation = change["operationType"]
+        if operation == "delete":
+            self._set_version(None)
+        elif operation in ("insert", "replace"):
+            # The document as written by this event
+            self._set_version(change.get("fullDocument"))
+        else:
+            # With updateLookup, fullDocument is the doc as it is now, possibly several bumps
+            # ahead of the exercise changes applied so far; the event's own fields are exact
+            description = change["updateDescription"]
+            updated = description.get("updatedFields", {})
+            removed = description.get("removedFields", [])
+            if "epoch" in updated or "epoch" in removed:
+                # Only the one-off migration of a pre-epoch doc does this; reload against the new epoch
+                raise PyMongoError("Catalogue version epoch changed.")
+            if "version" in removed:
+                self._version = None
+            elif "version" in updated and self._version is not None:
+                self._version = CatalogueVersion(self._version.epoch, updated["version"])
+
+    def _apply(self, change):
+        operation = change["operationType"]
+        if change.get("ns", {}).get("coll") == "meta" and operation in ("insert", "update", "replace", "delete"):
+            if change["documentKey"]["_id"] == CATALOGUE_VERSION_ID:
+                self._apply_version_change(change)
+            return
+        if operation in ("insert", "update", "replace"):
+            # With updateLookup the current document comes along; None means it was deleted since
+            if change.get("fullDocument") is None:
+                self._delete(change["documentKey"]["_id"])
+            else:
+                self._put(change["fullDocument"])
+        elif operation == "delete":
+            self._delete(change["documentKey"]["_id"])
+        else:
+            # drop, rename, dropDatabase or invalidate: the stream is over
+            raise PyMongoError(f"Change stream ended by '{operation}'.")
+
+    def _sync(self, db):
+        """Loads the collection and follows the database's change stream until an error, lag or stop()."""
+        pipeline = [{"$match": {"$or": [
+            {"ns.coll": {"$in": REPLICA_COLLECTIONS}},
+            # Database-wide events that end the stream carry no collection
+            {"operationType": {"$in": ["dropDatabase", "invalidate"]}},
+        ]}}]
+        with db.watch(pipeline, full_document="updateLookup", max_await_time_ms=REPLICA_AWAIT_MS) as stream:
+            started = time.perf_counter()
+            self._load(db)
+            print(f"Catalogue replica loaded {len(self._docs)} exercises in {time.perf_counter() - started:.2f}s")
+            self.lag_seconds = None
+            self._synced = True
+            while not self._stop.is_set():
+                change = stream.try_next()
+                if change is None:
+                    # Nothing pending: caught up with the server
+                    self.lag_seconds = 0.0
+                    continue
+                self._apply(change)
+                self.last_change_at = time.time()
+                self.lag_seconds = max(0.0, time.time() - change["clusterTime"].time)
+                if self.lag_seconds > CATALOGUE_REPLICA_MAX_LAG:
+                    print(f"Catalogue replica is {self.lag_seconds:.0f}s behind; resyncing.")
+                    return
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = get_db()
+            if db is None:
+                self._stop.wait(CATALOGUE_REPLICA_RETRY_SECONDS)
+                continue
+            failed = False
+            try:
+                # Returns when the stream falls behind or on stop()
+                self._sync(db)
+            except PyMongoError as e:
+                # Includes ChangeStreamHistoryLost when the oplog has moved past our position
+                print(f"Catalogue replica stream failed: {e}")
+                self.last_error = str(e)
+                failed = True
+            self._synced = False
+            self._version = None
+            if self._stop.is_set():
+                return
+            self.resync_count += 1
+            if failed:
+                self._stop.wait(CATALOGUE_REPLICA_RETRY_SECONDS)
+
+
+replica = CatalogueReplica()
+
+
+def start_catalogue_replica():
+    """Starts the replica thread in this process if CATALOGUE_REPLICA=1."""
+    if CATALOGUE_REPLICA_ENABLED:
+        replica.start()
+
@@ -0,0 +1,155 @@
+import glob
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+from flask import request, send_file
+from btm_workout_compression import COMPRESS_BROTLI_QUALITY, COMPRESS_GZIP_LEVEL, CONTENT_ENCODINGS, brotli
+
+# Pre-serialized copies of the full /api/v1/exercises_list body, one set per
+# database and catalogue version, written to a directory every gunicorn
+# worker on the host shares. Database names cannot contain ".", so the
+# name.v prefix never matches another database's files. Responses are sent with send_file, which lets gunicorn use
+# sendfile() straight from the page cache instead of copying the body.
+CATALOGUE_SNAPSHOT_ENABLED = os.getenv("CATALOGUE_SNAPSHOT", "1") != "0"
+CATALOGUE_SNAPSHOT_DIR = os.getenv("CATALOGUE_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "btm_workout_snapshots")
+# A build lock older than this is assumed to belong to a crashed worker
+SNAPSHOT_LOCK_TIMEOUT = 300
+SNAPSHOT_CURSOR_BATCH = 500
+SNAPSHOT_CHUNK_SIZE = 256 * 1024
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def snapshot_path(db_name, version, encoding=None):
+    suffix = {None: "", "gzip": ".gz", "br": ".br"}[encoding]
+    return os.path.join(CATALOGUE_SNAPSHOT_DIR, f"catalogue.{db_name}.v{version}.json{suffix}")
+
+
+def _write_atomically(path, write):
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _compress_file(src_path, dst_file, encoding):
+    with open(src_path, "rb") as src:
+        if encoding == "gzip":
+            # Without filename/mtime the header would carry the temp file's path and the build time
+            with gzip.GzipFile(filename="", fileobj=dst_file, mode="wb", compresslevel=COMPRESS_GZIP_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, SNAPSHOT_CHUNK_SIZE)
+            return
+        compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        for chunk in iter(lambda: src.read(SNAPSHOT_CHUNK_SIZE), b""):
+            dst_file.write(compressor.process(chunk))
+        dst_file.write(compressor.finish())
+
+
+def build_snapshot(db, version, dumps):
+    """
+    Streams the catalogue from MongoDB into the raw snapshot file, then writes
+    one compressed copy per supported encoding. Memory use is one cursor batch.
+    """
+    raw_path = snapshot_path(db.name, version)
+
+    def write_raw(f):
+        f.write(b"[")
+        for i, exercise in enumerate(db.exercises.find({}, {"_id": 0}, batch_size=SNAPSHOT_CURSOR_BATCH)):
+            if i:
+                f.write(b",")
+            f.write(dumps(exercise).encode())
+        f.write(b"]\n")
+
+    _write_atomically(raw_path, write_raw)
+    for encoding in CONTENT_ENCODINGS:
+        _write_atomically(snapshot_path(db.name, version, encoding), lambda f, e=encoding: _compress_file(raw_path, f, e))
+
+    # Older versions of this database are no longer served; open files stay readable until closed
+    current = {raw_path} | {snapshot_path(db.name, version, encoding) for encoding in CONTENT_ENCODINGS}
+    for path in glob.glob(os.path.join(CATALOGUE_SNAPSHOT_DIR, f"catalogue.{glob.escape(db.name)}.v*.json*")):
+        # Temporary files and build locks belong to builds still in progress
+        if path not in current and ".tmp-" not in path and not path.endswith(".lock"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _acquire_build_lock(db_name, version):
+    lock_path = snapshot_path(db_name, version) + ".lock"
+    try:
+        if time.time() - os.path.getmtime(lock_path) > SNAPSHOT_LOCK_TIMEOUT:
+            os.remove(lock_path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return lock_path
+    except FileExistsError:
+        return None
+
+
+def _build_in_background(db, version, dumps):
+    key = (db.name, str(version))
+    lock_path = _acquire_build_lock(db.name, version)
+    if lock_path is None:
+        # Another worker is already building this version
+        with _building_lock:
+            _building.discard(key)
+        return
+    try:
+        started = time.perf_counter()
+        build_snapshot(db, version, dumps)
+        print(f"Catalogue snapshot v{version} built in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"Failed to build catalogue snapshot v{version}: {e}")
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+        with _building_lock:
+            _building.discard(key)
+
+
+def serve_catalogue_snapshot(db, version, dumps):
+    """
+    Returns a response streaming the snapshot for version in the client's
+    preferred encoding, or None if it is not built yet. A missing snapshot is
+    built in a background thread and the caller serves this request itself.
+    """
+    if not os.path.exists(snapshot_path(db.name, version)):
+        os.makedirs(CATALOGUE_SNAPSHOT_DIR, exist_ok=True)
+        key = (db.name, str(version))
+        with _building_lock:
+            if key in _building:
+                return None
+            _building.add(key)
+        threading.Thread(target=_build_in_background, args=(db, version, dumps), daemon=True).start()
+        return None
+
+    encoding = request.accept_encodings.best_match(CONTENT_ENCODINGS)
+    path = snapshot_path(db.name, version, encoding)
+    if encoding is not None and not os.path.exists(path):
+        encoding, path = None, snapshot_path(db.name, version)
+
+    try:
+        response = send_file(path, mimetype="application/json", conditional=False, etag=False)
+    except FileNotFoundError:
+        # Removed by a worker that just built a newer version
+        return None
+    response.vary.add("Accept-Encoding")
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+        response.set_etag(f"{version}-{encoding}")
+    else:
+        response.set_etag(str(version))
+    return response
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { getBootstrap } from './api';
 import './css/NewExerciseForm.css';
 
 function NewExerciseForm() {
@@ -23,14 +24,11 @@ function NewExerciseForm() {
     useEffect(() => {
         const fetchDropdownData = async () => {
             try {
-                const [bodyPartsRes, equipmentRes, difficultiesRes] = await Promise.all([
-                    axios.get('/api/body_parts_list'),
-                    axios.get('/api/equipment_list'),
-                    axios.get('/api/difficulties')
-                ]);
-                setBodyParts(bodyPartsRes.data);
-                setEquipmentList(equipmentRes.data);
-                setDifficulties(difficultiesRes.data);
+                // One request for all three dropdowns
+                const bootstrap = await getBootstrap();
+                setBodyParts(bootstrap.bodyParts);
+                setEquipmentList(bootstrap.equipment);
+                setDifficulties(bootstrap.difficulties);
             } catch (err) {
                 console.error("Failed to fetch dropdown data:", err);
                 setMessage("Failed to load form options. Please check the server.");
@@ -41,10 +39,10 @@ function NewExerciseForm() {
     }, []);
 
     useEffect(() => {
-        if (formData.bodyPart && !bodyParts.some(bp => bp.name === formData.bodyPart)) {
+        if (formData.bodyPart && !bodyParts.includes(formData.bodyPart)) {
             setFormData(prevState => ({ ...prevState, bodyPart: '' }));
         }
-        if (formData.equipment && !equipmentList.some(eq => eq.name === formData.equipment)) {
+        if (formData.equipment && !equipmentList.includes(formData.equipment)) {
             setFormData(prevState => ({ ...prevState, equipment: '' }));
         }
     }, [bodyParts, equipmentList, formData.bodyPart, formData.equipment]);
@@ -128,7 +126,7 @@ function NewExerciseForm() {
                         <select name="bodyPart" value={formData.bodyPart} onChange={handleChange} required>
                             <option value="">--Select--</option>
                             {bodyParts.map(part => (
-                                <option key={part.name} value={part.name}>{part.name}</option>
+                                <option key={part} value={part}>{part}</option>
                             ))}
                         </select>
                     ) : (
@@ -142,7 +140,7 @@ function NewExerciseForm() {
                         <select name="equipment" value={formData.equipment} onChange={handleChange} required>
                             <option value="">--Select--</option>
                             {equipmentList.map(eq => (
-                                <option key={eq.name} value={eq.name}>{eq.name}</option>
+                                <option key={eq} value={eq}>{eq}</option>
                             ))}
                         </select>
                     ) : (
@@ -3,21 +3,42 @@ import axios from 'axios';
 // --- ABSOLUTE URL FIX: This guarantees requests hit Render and bypasses GitHub Pages ---
 const API_BASE_URL = 'https://btm-workout.onrender.com';
 
+// ===================================
+// HTTP CACHING
+// ===================================
+
+// Catalogue GETs carry an ETag and Cache-Control: must-revalidate, so the
+// browser's HTTP cache revalidates them itself and turns a 304 into the
+// cached 200 response. Sending If-None-Match by hand would make every call a
+// non-simple CORS request with a preflight, so the getters below use plain GETs.
+
 // ===================================
 // GETTERS (Data Retrieval)
 // ===================================
 
+// 0. Startup Data: taxonomy lists, catalogue version and counts in one request
+// Returns { version, bodyParts, equipment, targets, difficulties, categories, counts }.
+// Concurrent callers share one in-flight request, so a page that needs several lists still makes one round trip.
+let bootstrapRequest = null;
+
+export const getBootstrap = async () => {
+    if (!bootstrapRequest) {
+        bootstrapRequest = axios.get(`${API_BASE_URL}/api/v1/bootstrap`).then((response) => response.data).finally(() => {
+            bootstrapRequest = null;
+        });
+    }
+    return bootstrapRequest;
+};
+
 // 1. Get List of Body Parts (for dropdown)
 export const getBodyParts = async () => {
-    const response = await axios.get(`${API_BASE_URL}/api/v1/body_parts_list`);
     // NOTE: This assumes your backend returns a list of strings (e.g., ["Legs", "Chest"])
-    return response.data; 
+    return (await getBootstrap()).bodyParts;
 };
 
 // 2. Get List of Equipment
 export const getEquipmentList = async () => {
-    const response = await axios.get(`${API_BASE_URL}/api/v1/equipment_list`);
-    return response.data; 
+    return (await getBootstrap()).equipment;
 };
 
 // 3. Get List of All Exercises
@@ -28,8 +49,7 @@ export const getExercisesList = async () => {
 
 // 4. Get List of Difficulties
 export const getDifficulties = async () => {
-    const response = await axios.get(`${API_BASE_URL}/api/v1/difficulties`);
-    return response.data;
+    return (await getBootstrap()).difficulties;
 };
 
 // 5. Get Single Exercise Details
@@ -38,6 +58,31 @@ export const getExerciseDetails = async (name) => {
     return response.data;
 };
 
+// 5a. Filter Exercises with per-facet counts
+// filters: { bodyPart, equipment, target, difficulty, category }, each a value or an array of values.
+// Returns { exercises, next_after, total, facets }; pass next_after back as `after` for the next page.
+export const queryExercises = async (filters = {}, { limit, after } = {}) => {
+    const response = await axios.get(`${API_BASE_URL}/api/v1/exercises/query?${new URLSearchParams(
+        Object.entries({ ...filters, limit, after })
+            .filter(([, value]) => value !== undefined && value !== null && value !== '')
+            .flatMap(([key, value]) => (Array.isArray(value) ? value : [value]).map((v) => [key, v]))
+    )}`);
+    return response.data;
+};
+
+// 5b. Search Exercises by name, target, secondary muscles and instructions (best matches first)
+// Not ETag-cached: every typed query is a different URL.
+export const searchExercises = async (q, limit = 20) => {
+    const response = await axios.get(`${API_BASE_URL}/api/v1/search`, { params: { q, limit } });
+    return response.data.results;
+};
+
+// 5c. Autocomplete Exercise Names (type-ahead; tolerates small typos)
+export const autocompleteExercises = async (prefix, limit = 10) => {
+    const response = await axios.get(`${API_BASE_URL}/api/v1/autocomplete`, { params: { prefix, limit } });
+    return response.data.results;
+};
+
 
 // ===================================
 // WORKOUT & UTILITY
@@ -53,9 +98,21 @@ export const generateWorkout = async (bodyPart, numExercises) => {
 };
 
 // 7. Refresh/Seed Database (for the tile)
+// The server runs the refresh as a background job, so poll its status until it finishes.
+const REFRESH_POLL_INTERVAL_MS = 2000;
+
 export const refreshDatabase = async () => {
     const response = await axios.post(`${API_BASE_URL}/api/v1/refresh_db`);
-    return response.data;
+    let job = response.data;
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, REFRESH_POLL_INTERVAL_MS));
+        const statusResponse = await axios.get(`${API_BASE_URL}${job.status_url || `/api/v1/refresh_db/${job.job_id}`}`);
+        job = statusResponse.data;
+    }
+    if (job.status === 'failed') {
+        throw new Error(job.error || 'Database refresh failed.');
+    }
+    return { ...job, message: `Database refresh complete. ${job.result.inserted} new exercises added, ${job.result.updated} updated.` };
 };
 
 
@@ -69,6 +126,13 @@ export const insertExercise = async (exerciseData) => {
     return response.data;
 };
 
+// 8b. Insert Many Exercises at once (e.g. importing a program)
+// Returns per-item results: inserted, duplicate or invalid.
+export const bulkInsertExercises = async (exercises) => {
+    const response = await axios.post(`${API_BASE_URL}/api/v1/exercises/bulk`, exercises);
+    return response.data;
+};
+
 // 9. Add New Body Part (for Management Page)
 export const addBodyPart = async (name) => {
     const response = await axios.post(`${API_BASE_URL}/api/v1/add_body_part`, { name });
@@ -93,6 +157,13 @@ export const deleteEquipment = async (name) => {
     return response.data;
 };
 
+// 13b. Delete Many Exercises by names or by filter ({ bodyPart, equipment, difficulty, target })
+// With dryRun the server only reports how many exercises match.
+export const bulkDeleteExercises = async ({ names, filter, dryRun = false }) => {
+    const response = await axios.post(`${API_BASE_URL}/api/v1/exercises/bulk_delete`, { names, filter, dry_run: dryRun });
+    return response.data;
+};
+
 // 13. Delete Exercise
 export const deleteExercise = async (name) => {
     const response = await axios.delete(`${API_BASE_URL}/api/v1/delete_exercise/${name}`);
@@ -2,8 +2,15 @@ import requests
 import os
 from dotenv import load_dotenv
 from btm_workout_db_connect import get_db
+from btm_workout_cache import invalidate_exercise_caches
+from exercise_sampler import sampler
+from exercise_autocomplete import name_index
+from exercisedb_client import ExerciseDBFormatError, iter_exercises
+from exercise_pagination import EXERCISE_KEY_FIELDS
 from pymongo.errors import BulkWriteError, DuplicateKeyError
 import json 
+import hashlib
+from pymongo import UpdateOne
 
 # 1. Load environment variables
 load_dotenv()
@@ -13,11 +20,116 @@ load_dotenv()
 RAPIDAPI_KEY = "YOUR_ACTUAL_RAPIDAPI_KEY_HERE" # <-- PASTE YOUR KEY HERE
 # --- END TEMPORARY FIX ---
 
+# Number of upserts sent per bulk_write round trip
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "500"))
 
-def insert_exercises_if_not_exist():
+# Fields written by the refresh; it upserts on EXERCISE_KEY_FIELDS (unique_exercise_index)
+MAPPED_EXERCISE_FIELDS = (
+    "name", "bodyPart", "equipment", "target", "gifUrl",
+    "secondaryMuscles", "instructions", "description", "difficulty", "category",
+)
+
+
+def map_api_exercise(exercise):
+    """Maps an ExerciseDB API exercise to the document shape every route reads."""
+    return {
+        "name": exercise.get("name"),
+        "bodyPart": exercise.get("bodyPart"),
+        "equipment": exercise.get("equipment"),
+        "target": exercise.get("target"),
+        "gifUrl": exercise.get("gifUrl"),
+        "secondaryMuscles": exercise.get("secondaryMuscles"),
+        "instructions": exercise.get("instructions"),
+        "description": exercise.get("description"),
+        "difficulty": exercise.get("difficulty"),
+        "category": exercise.get("category") # <--- FIX: ADDED MISSING FIELD
+    }
+
+
+def exercise_key(mapped_exercise):
+    return tuple(mapped_exercise.get(field) for field in EXERCISE_KEY_FIELDS)
+
+
+def exercise_fingerprint(mapped_exercise):
+    """Stable hash of the mapped fields, used to skip writes for unchanged exercises."""
+    content = {field: mapped_exercise.get(field) for field in MAPPED_EXERCISE_FIELDS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load_existing_fingerprints(exercises_collection):
+    """Reads every stored exercise in one projected query and returns {key: fingerprint}."""
+    projection = {field: 1 for field in MAPPED_EXERCISE_FIELDS}
+    projection["_id"] = 0
+    return {
+        exercise_key(doc): exercise_fingerprint(doc)
+        for doc in exercises_collection.find({}, projection)
+    }
+
+
+def upsert_exercises(exercises_collection, mapped_exercises, batch_size=None, progress=None):
+    """
+    Writes mapped exercises with batched, unordered bulk_write upserts.
+
+    Existing keys are pre-loaded once, so unchanged exercises cost no round
+    trip and new or changed ones are sent batch_size at a time.
+    progress(phase, processed), if given, is called after every batch.
+    Returns {"inserted": n, "updated": n, "unchanged": n, "skipped": n}.
+    """
+    batch_size = batch_size or REFRESH_BATCH_SIZE
+    existing = load_existing_fingerprints(exercises_collection)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    operations = []
+    processed = 0
+
+    def flush():
+        if not operations:
+            return
+        try:
+            result = exercises_collection.bulk_write(operations, ordered=False)
+        finally:
+            # Even a failed unordered batch may have written some documents
+            invalidate_exercise_caches()
+            sampler.invalidate()
+            name_index.invalidate()
+        stats["inserted"] += result.upserted_count
+        stats["updated"] += result.modified_count
+        operations.clear()
+        if progress:
+            progress("writing", processed)
+
+    for mapped_exercise in mapped_exercises:
+        processed += 1
+        key = exercise_key(mapped_exercise)
+        if None in key:
+            # Without the whole unique key the upsert would match unrelated documents
+            stats["skipped"] += 1
+            continue
+        fingerprint = exercise_fingerprint(mapped_exercise)
+        if existing.get(key) == fingerprint:
+            stats["unchanged"] += 1
+            continue
+        # Remember what this run wrote so repeated API entries are not sent twice
+        existing[key] = fingerprint
+        operations.append(UpdateOne(
+            dict(zip(EXERCISE_KEY_FIELDS, key)),
+            {"$set": mapped_exercise},
+            upsert=True,
+        ))
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+    if progress:
+        progress("writing", processed)
+
+    return stats
+
+
+def insert_exercises_if_not_exist(batch_size=None, progress=None):
     """
-    Fetches all exercises from the API and inserts them into the database,
+    Fetches all exercises from the API and upserts them into the database,
     mapping API fields to the application's required MongoDB field names.
+    progress(phase, processed) is called as the refresh moves along.
+    Returns {"inserted", "updated", "unchanged", "skipped"} counts, or {"error": ...}.
     """
     db = get_db()
     if db is None:
@@ -29,72 +141,34 @@ def insert_exercises_if_not_exist():
     try:
         exercises_collection = db['exercises']
         
-        # FIX: Added 'limit=0' parameter to force API to return all exercises (pagination fix)
-        api_url = "https://exercisedb.p.rapidapi.com/exercises?limit=0" 
-        
-        headers = {
-            "X-RapidAPI-Key": RAPIDAPI_KEY,
-            "X-RapidAPI-Host": "exercisedb.p.rapidapi.com"
-        }
-
         print("--- Attempting API Fetch from ExerciseDB ---")
-        
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status() # Must be 200 OK
-        api_exercises = response.json()
-        
-        # --- NEW DEBUGGING LOGGING ---
-        # Log the response content to see what the API actually sent back
-        print(f"API RESPONSE STATUS: {response.status_code}")
-        print(f"API RESPONSE ITEMS RECEIVED: {len(api_exercises) if isinstance(api_exercises, list) else 'Non-list data'}")
-        print(f"API RAW RESPONSE HEAD: {json.dumps(api_exercises)[:200]}")
-        # --- END DEBUGGING LOGGING ---
-
-
-        # --- FINAL CHECK: Validation ---
-        if not isinstance(api_exercises, list):
-            # The API returned an unexpected payload (not the list of exercises)
-            return {"error": "API returned unexpected data format. Check server logs."}
-        # --- END FINAL CHECK ---
-
-        inserted_count = 0
-        exercises_to_insert = []
-
-        for exercise in api_exercises:
-            # --- Map API field names to MongoDB field names (final structure) ---
-            mapped_exercise = {
-                "exercise_name": exercise.get("name"),    
-                "body_part": exercise.get("bodyPart"),    
-                "equipment": exercise.get("equipment"),
-                "target": exercise.get("target"),
-                "gifUrl": exercise.get("gifUrl"),
-                "secondaryMuscles": exercise.get("secondaryMuscles"),
-                "instructions": exercise.get("instructions"),
-                "description": exercise.get("description"),
-                "difficulty": exercise.get("difficulty"),
-                "category": exercise.get("category") # <--- FIX: ADDED MISSING FIELD
-            }
-
-            # Check if an exercise with the same mapped fields already exists
-            existing_exercise = exercises_collection.find_one({
-                "exercise_name": mapped_exercise["exercise_name"],
-                "body_part": mapped_exercise["body_part"],
-                "equipment": mapped_exercise["equipment"]
-            })
-
-            if not existing_exercise:
-                exercises_to_insert.append(mapped_exercise)
-        
-        if exercises_to_insert:
-            # Insert all exercises in one batch for performance
-            result = exercises_collection.insert_many(exercises_to_insert, ordered=False)
-            inserted_count = len(result.inserted_ids)
-            print(f"Successfully inserted {inserted_count} new documents.")
-        else:
-            print("No new exercises found to insert.")
-        
-        return inserted_count
+        if progress:
+            progress("fetching", 0)
+
+        # Exercises are parsed off the response stream and written as they
+        # arrive, so memory stays bounded by the page and batch sizes and the
+        # download of later pages overlaps with the bulk writes of earlier ones
+        api_exercises = iter_exercises(RAPIDAPI_KEY)
+
+        stats = upsert_exercises(
+            exercises_collection,
+            (map_api_exercise(exercise) for exercise in api_exercises),
+            batch_size=batch_size,
+            progress=progress,
+        )
+        print(f"Refresh complete: {stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged, {stats['skipped']} skipped.")
+        if stats['inserted'] or stats['updated']:
+            # Rebuild now so the first keystroke after a refresh does not pay for it
+            try:
+                name_index.reload(db)
+            except Exception as e:
+                print(f"Autocomplete index rebuild deferred: {e}")
+        return stats
 
+    except ExerciseDBFormatError as e:
+        # The API returned an unexpected payload (not the list of exercises)
+        print(f"Unexpected API payload: {e}")
+        return {"error": "API returned unexpected data format. Check server logs."}
     except requests.exceptions.RequestException as e:
         print(f"Error fetching exercises from API: {e}")
         return {"error": f"API Request Failed: {e}"}
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from btm_workout_db_connect import get_db
+from database_refresh import insert_exercises_if_not_exist
+
+# Jobs are stored in MongoDB so a status poll can land on any gunicorn
+# worker, and a partial unique index on "active" lets only one refresh run
+# at a time across all of them.
+REFRESH_JOBS_COLLECTION = "refresh_jobs"
+# Finished jobs are removed by a TTL index this long after they end
+REFRESH_JOB_RETENTION_SECONDS = int(os.getenv("REFRESH_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# An active job whose worker has not checked in for this long is treated as dead
+REFRESH_JOB_STALE_SECONDS = float(os.getenv("REFRESH_JOB_STALE_SECONDS", "300"))
+HEARTBEAT_INTERVAL = 30
+# Progress is written to MongoDB at most this often
+PROGRESS_WRITE_INTERVAL = 1.0
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+
+class RefreshJob:
+    """State of one background database refresh, as stored in refresh_jobs."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    @property
+    def id(self):
+        return self.doc["_id"]
+
+    def to_dict(self):
+        doc = self.doc
+        started_at = doc.get("started_at")
+        end = doc.get("finished_at") or time.time()
+        elapsed = end - started_at if started_at else 0
+        processed = doc.get("processed", 0)
+        return {
+            "job_id": doc["_id"],
+            "status": doc["status"],  # queued -> running -> succeeded | failed
+            "phase": doc.get("phase"),
+            "processed": processed,
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_second": round(processed / elapsed, 1) if elapsed else 0,
+            "result": doc.get("result"),
+            "error": doc.get("error"),
+        }
+
+
+def refresh_jobs_collection(db):
+    global _indexes_ready
+    jobs = db[REFRESH_JOBS_COLLECTION]
+    if not _indexes_ready:
+        with _indexes_lock:
+            if not _indexes_ready:
+                jobs.create_index([("active", ASCENDING)], name="one_active_refresh", unique=True,
+                                  partialFilterExpression={"active": True})
+                jobs.create_index([("expire_at", ASCENDING)], name="refresh_job_expiry", expireAfterSeconds=0)
+                _indexes_ready = True
+    return jobs
+
+
+def _finish(jobs, job_id, fields):
+    now = time.time()
+    fields = dict(fields, phase="done", finished_at=now,
+                  expire_at=datetime.now(timezone.utc) + timedelta(seconds=REFRESH_JOB_RETENTION_SECONDS))
+    jobs.update_one({"_id": job_id}, {"$set": fields, "$unset": {"active": ""}})
+
+
+def start_refresh_job():
+    """
+    Starts a refresh in a worker thread and returns (job, created).
+
+    If a refresh is already queued or running in any worker, that job is
+    returned instead and created is False.
+    """
+    db = get_db()
+    if db is None:
+        raise RuntimeError("Database not connected.")
+    jobs = refresh_jobs_collection(db)
+
+    while True:
+        now = time.time()
+        doc = {
+            "_id": uuid.uuid4().hex,
+            "status": "queued",
+            "phase": "queued",
+            "processed": 0,
+            "created_at": now,
+            "heartbeat_at": now,
+            "active": True,
+        }
+        try:
+            jobs.insert_one(doc)
+            break
+        except DuplicateKeyError:
+            existing = jobs.find_one({"active": True})
+            if existing is None:
+                # It finished between our insert and the lookup
+                continue
+            if now - existing.get("heartbeat_at", 0) <= REFRESH_JOB_STALE_SECONDS:
+                return RefreshJob(existing), False
+            # The worker running it died; release the slot and try again
+            print(f"Refresh job {existing['_id']} stopped checking in; marking it failed.")
+            _finish(jobs, existing["_id"], {"status": "failed", "error": "The worker running this refresh stopped."})
+
+    thread = threading.Thread(target=_run_job, args=(jobs, doc["_id"]), name=f"refresh-{doc['_id'][:8]}", daemon=True)
+    thread.start()
+    return RefreshJob(doc), True
+
+
+def get_refresh_job(job_id):
+    db = get_db()
+    if db is None:
+        raise RuntimeError("Database not connected.")
+    doc = refresh_jobs_collection(db).find_one({"_id": job_id})
+    return RefreshJob(doc) if doc is not None else None
+
+
+def _run_job(jobs, job_id):
+    started_at = time.time()
+    jobs.update_one({"_id": job_id}, {"$set": {"status": "running", "started_at": started_at, "heartbeat_at": started_at}})
+
+    # Keeps heartbeat_at fresh even while a single API page or batch takes long
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(HEARTBEAT_INTERVAL):
+            jobs.update_one({"_id": job_id}, {"$set": {"heartbeat_at": time.time()}})
+
+    threading.Thread(target=heartbeat, name=f"refresh-heartbeat-{job_id[:8]}", daemon=True).start()
+
+    last_write = {"phase": None, "at": 0.0}
+
+    def update_progress(phase, processed):
+        now = time.time()
+        if phase == last_write["phase"] and now - last_write["at"] < PROGRESS_WRITE_INTERVAL:
+            return
+        last_write.update(phase=phase, at=now)
+        jobs.update_one({"_id": job_id}, {"$set": {"phase": phase, "processed": processed, "heartbeat_at": now}})
+
+    try:
+        result = insert_exercises_if_not_exist(progress=update_progress)
+        if isinstance(result, dict) and "error" in result:
+            fields = {"status": "failed", "error": result["error"]}
+        else:
+            processed = sum(result.values()) if isinstance(result, dict) else 0
+            fields = {"status": "succeeded", "result": result, "processed": processed}
+    except Exception as e:
+        print(f"Refresh job {job_id} failed: {e}")
+        fields = {"status": "failed", "error": str(e)}
+    finally:
+        stop_heartbeat.set()
+    _finish(jobs, job_id, fields)
@@ -1,5 +1,130 @@
+import argparse
+import random
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pymongo.errors import BulkWriteError
 from btm_workout_db_connect import get_db
+from btm_workout_cache import invalidate_exercise_caches
+
+# --- Synthetic catalogue ---
+# Body parts and their usual target muscles, following ExerciseDB's naming
+SYNTHETIC_BODY_PARTS = {
+    "back": ["lats", "upper back", "traps", "spine"],
+    "cardio": ["cardiovascular system"],
+    "chest": ["pectorals", "serratus anterior"],
+    "lower arms": ["forearms"],
+    "lower legs": ["calves"],
+    "neck": ["levator scapulae"],
+    "shoulders": ["delts"],
+    "upper arms": ["biceps", "triceps"],
+    "upper legs": ["quads", "hamstrings", "glutes", "adductors", "abductors"],
+    "waist": ["abs", "obliques"],
+}
+SYNTHETIC_EQUIPMENT = [
+    "barbell", "body weight", "cable", "dumbbell", "ez barbell", "kettlebell",
+    "leverage machine", "medicine ball", "resistance band", "smith machine",
+]
+SYNTHETIC_DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+SYNTHETIC_MOVEMENTS = ["press", "row", "curl", "raise", "squat", "lunge", "pull", "fly", "extension", "crunch", "hold", "twist"]
+SYNTHETIC_VARIATIONS = ["", "incline ", "decline ", "seated ", "standing ", "single arm ", "alternating ", "wide grip ", "close grip "]
+
+
+def parse_weights(spec, choices):
+    """Parses "chest=3,back=1" into weights aligned with choices; unlisted choices get weight 1."""
+    weights = {choice: 1.0 for choice in choices}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, weight = item.rpartition("=")
+        if name not in weights:
+            raise ValueError(f"Unknown value '{name}'. Choose from: {', '.join(choices)}")
+        weights[name] = float(weight)
+    return [weights[choice] for choice in choices]
+
+
+def generate_exercises(start, stop, seed=0, body_part_weights=None, equipment_weights=None, difficulty_weights=None):
+    """
+    Generates exercises start..stop-1. Each index always produces the same
+    exercise for a given seed, so ranges can be generated independently in
+    parallel. Weights are lists aligned with the SYNTHETIC_* choices.
+    """
+    body_parts = list(SYNTHETIC_BODY_PARTS)
+    exercises = []
+    for i in range(start, stop):
+        rng = random.Random(seed * 1_000_003 + i)
+        body_part = rng.choices(body_parts, weights=body_part_weights)[0]
+        equipment = rng.choices(SYNTHETIC_EQUIPMENT, weights=equipment_weights)[0]
+        difficulty = rng.choices(SYNTHETIC_DIFFICULTIES, weights=difficulty_weights)[0]
+        target = rng.choice(SYNTHETIC_BODY_PARTS[body_part])
+        movement = rng.choice(SYNTHETIC_MOVEMENTS)
+        name = f"{equipment} {rng.choice(SYNTHETIC_VARIATIONS)}{target} {movement} {i}"
+        exercises.append({
+            "name": name,
+            "bodyPart": body_part,
+            "equipment": equipment,
+            "target": target,
+            "secondaryMuscles": rng.sample([t for targets in SYNTHETIC_BODY_PARTS.values() for t in targets if t != target], 2),
+            "instructions": [
+                f"Set up the {equipment} for the {movement}.",
+                f"Brace your core and {movement} with control, focusing on the {target}.",
+                "Pause briefly at the end of the movement.",
+                "Return to the starting position and repeat.",
+            ][:rng.randint(2, 4)],
+            "description": f"{'An' if difficulty[0] in 'aeiou' else 'A'} {difficulty} {body_part} exercise that trains the {target} using {equipment}.",
+            "difficulty": difficulty,
+            "category": "cardio" if body_part == "cardio" else "strength",
+            "reps": f"{rng.choice([6, 8, 10, 12])}-{rng.choice([12, 15, 20])}",
+            "sets": str(rng.randint(2, 5)),
+        })
+    return exercises
+
+
+def seed_synthetic_catalogue(count, batch_size=1000, threads=4, seed=0, keep_existing=False,
+                             body_part_weights=None, equipment_weights=None, difficulty_weights=None):
+    """
+    Generates count exercises and streams them into MongoDB with unordered
+    insert_many batches spread over threads. Returns the number inserted.
+    """
+    db = get_db()
+    if db is None:
+        print("❌ Error: Could not connect to the database. Check your .env MONGO_URI.")
+        sys.exit(1)
+
+    if not keep_existing:
+        db.exercises.delete_many({})
+
+    print(f"Seeding {count} synthetic exercises ({threads} threads, batches of {batch_size})...")
+    started = time.perf_counter()
+
+    def insert_batch(batch_start):
+        batch = generate_exercises(
+            batch_start, min(batch_start + batch_size, count), seed,
+            body_part_weights, equipment_weights, difficulty_weights,
+        )
+        try:
+            return len(db.exercises.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Duplicates from an earlier run with the same seed are skipped
+            return e.details.get("nInserted", 0)
+
+    inserted = 0
+    pending = set()
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for batch_start in range(0, count, batch_size):
+                # Keep only a few batches in memory at a time
+                if len(pending) >= threads * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    inserted += sum(future.result() for future in done)
+                pending.add(executor.submit(insert_batch, batch_start))
+            inserted += sum(future.result() for future in pending)
+    finally:
+        # Running servers key their caches, ETags and indexes on the catalogue version
+        invalidate_exercise_caches()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Inserted {inserted} exercises in {elapsed:.2f}s ({inserted / elapsed if elapsed else 0:.0f} docs/s).")
+    return inserted
+
 
 def seed_database():
     db = get_db()
@@ -69,10 +194,37 @@ def seed_database():
             "difficulty": "Beginner",
         },
     ]
-    db.exercises.delete_many({})
-    db.exercises.insert_many(exercises_data)
-    
+    try:
+        db.exercises.delete_many({})
+        db.exercises.insert_many(exercises_data)
+    finally:
+        # Running servers key their caches, ETags and indexes on the catalogue version
+        invalidate_exercise_caches()
+
     print("✅ Database seeding complete! Check your live app.")
 
 if __name__ == "__main__":
-    seed_database()
+    parser = argparse.ArgumentParser(description="Seed the database with sample or synthetic exercises.")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="generate N synthetic exercises instead of the sample data")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-existing", action="store_true", help="do not delete existing exercises first")
+    parser.add_argument("--body-parts", help='weights such as "chest=3,back=2" (others default to 1)')
+    parser.add_argument("--equipment", help='weights such as "barbell=4,dumbbell=4"')
+    parser.add_argument("--difficulty", help='weights such as "beginner=5,advanced=1"')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        seed_synthetic_catalogue(
+            args.synthetic,
+            batch_size=args.batch_size,
+            threads=args.threads,
+            seed=args.seed,
+            keep_existing=args.keep_existing,
+            body_part_weights=parse_weights(args.body_parts, list(SYNTHETIC_BODY_PARTS)),
+            equipment_weights=parse_weights(args.equipment, SYNTHETIC_EQUIPMENT),
+            difficulty_weights=parse_weights(args.difficulty, SYNTHETIC_DIFFICULTIES),
+        )
+    else:
+        seed_database()
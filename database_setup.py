@@ -1,5 +1,79 @@
-from pymongo import ASCENDING
+import sys
+from pymongo import ASCENDING, TEXT
 from btm_workout_db_connect import get_db
+from exercise_pagination import EXERCISE_KEY_FIELDS, exercise_keyset_filter
+
+# Secondary indexes for the fields the server and the refresh filter on.
+# Each entry is (collection, keys, options).
+SECONDARY_INDEXES = [
+    # difficulties distinct
+    ("exercises", [("difficulty", ASCENDING)], {"name": "exercise_difficulty"}),
+    # /api/v1/exercises/query leading $match: any filter on bodyPart, or on equipment,
+    # narrows through an index prefix, and adding target narrows further.
+    # The bodyPart prefix also serves get_random_exercises sampling, the delete_body_part
+    # cascade and the body_parts_list distinct.
+    ("exercises", [("bodyPart", ASCENDING), ("equipment", ASCENDING), ("target", ASCENDING)],
+     {"name": "exercise_facet_body_part"}),
+    # The equipment prefix also serves the delete_equipment cascade and the equipment_list distinct
+    ("exercises", [("equipment", ASCENDING), ("target", ASCENDING)], {"name": "exercise_facet_equipment"}),
+    # bulk_delete target filter
+    ("exercises", [("target", ASCENDING)], {"name": "exercise_target"}),
+    # /api/v1/search relevance ranking; a collection can have only one text index
+    ("exercises", [("name", TEXT), ("target", TEXT), ("secondaryMuscles", TEXT), ("instructions", TEXT)],
+     {"name": "exercise_text_search", "weights": {"name": 10, "target": 5, "secondaryMuscles": 3, "instructions": 1}}),
+]
+
+# Indexes earlier versions created that nothing uses any more; dropped on setup.
+OBSOLETE_INDEXES = [
+    # The refresh used to upsert on (exercise_name, body_part, equipment); it now uses unique_exercise_index
+    ("exercises", "refresh_exercise_key"),
+    # Prefixes of exercise_facet_body_part and exercise_facet_equipment
+    ("exercises", "exercise_body_part"),
+    ("exercises", "exercise_equipment"),
+]
+
+def count_documents_command(query):
+    """The aggregate pymongo's Collection.count_documents(query) sends."""
+    return {"aggregate": "exercises", "cursor": {}, "pipeline": [
+        {"$match": query}, {"$group": {"_id": 1, "n": {"$sum": 1}}}]}
+
+# Query shapes issued by flask_server.py and database_refresh.py, as explain-able commands.
+# Values are placeholders; only the plan shape matters.
+QUERY_SHAPES = [
+    ("GET /api/v1/exercise/<name>", {"find": "exercises", "filter": {"name": "Squat"}, "limit": 1}),
+    ("GET /api/v1/exercises_list?limit=&after=", {"find": "exercises",
+                                                  "filter": exercise_keyset_filter(["Squat", "upper legs", "barbell"]),
+                                                  "sort": {f: ASCENDING for f in EXERCISE_KEY_FIELDS}, "limit": 51}),
+    ("GET /api/v1/body_parts_list", {"distinct": "exercises", "key": "bodyPart"}),
+    ("GET /api/v1/equipment_list", {"distinct": "exercises", "key": "equipment"}),
+    ("GET /api/v1/difficulties", {"distinct": "exercises", "key": "difficulty"}),
+    ("POST /api/v1/get_random_exercises (sampler load)", {"find": "exercises", "filter": {"bodyPart": {"$exists": True}},
+                                                         "projection": {"_id": 1, "bodyPart": 1}}),
+    ("DELETE /api/v1/delete_exercise/<name>", {"delete": "exercises", "deletes": [{"q": {"name": "Squat"}, "limit": 1}]}),
+    ("DELETE /api/v1/delete_body_part/<name>", {"delete": "exercises", "deletes": [{"q": {"bodyPart": "Legs"}, "limit": 0}]}),
+    ("DELETE /api/v1/delete_equipment/<name>", {"delete": "exercises", "deletes": [{"q": {"equipment": "Barbell"}, "limit": 0}]}),
+    ("DELETE /api/v1/delete_body_part (body_parts)", {"delete": "body_parts", "deletes": [{"q": {"name": "Legs"}, "limit": 1}]}),
+    ("DELETE /api/v1/delete_equipment (equipment)", {"delete": "equipment", "deletes": [{"q": {"name": "Barbell"}, "limit": 1}]}),
+    ("POST /api/v1/exercises/bulk_delete (names)", {"delete": "exercises", "deletes": [{"q": {"name": {"$in": ["Squat"]}}, "limit": 0}]}),
+    ("POST /api/v1/exercises/bulk_delete (target)", {"delete": "exercises", "deletes": [{"q": {"target": "quads"}, "limit": 0}]}),
+    # count_documents() runs this aggregate, not the count command
+    ("POST /api/v1/exercises/bulk_delete dry_run (target)", count_documents_command({"target": "quads"})),
+    ("POST /api/v1/exercises/bulk_delete dry_run (bodyPart, equipment)",
+     count_documents_command({"bodyPart": "upper legs", "equipment": {"$in": ["barbell"]}})),
+    ("POST /api/v1/exercises/bulk_delete dry_run (names)", count_documents_command({"name": {"$in": ["Squat"]}})),
+    ("GET /api/v1/search", {"find": "exercises", "filter": {"$text": {"$search": "squat"}},
+                            "projection": {"score": {"$meta": "textScore"}}, "sort": {"score": {"$meta": "textScore"}},
+                            "limit": 20}),
+    ("GET /api/v1/exercises/query (bodyPart, equipment)", {"aggregate": "exercises", "cursor": {}, "pipeline": [
+        {"$match": {"bodyPart": "upper legs", "equipment": {"$in": ["barbell", "body weight"]}}},
+        {"$facet": {"total": [{"$count": "count"}]}}]}),
+    ("GET /api/v1/exercises/query (equipment, target)", {"aggregate": "exercises", "cursor": {}, "pipeline": [
+        {"$match": {"equipment": "barbell", "target": "quads"}},
+        {"$facet": {"total": [{"$count": "count"}]}}]}),
+    ("refresh upsert", {"update": "exercises", "updates": [{
+        "q": {"name": "squat", "bodyPart": "upper legs", "equipment": "body weight"},
+        "u": {"$set": {"target": "quads"}}, "upsert": True}]}),
+]
 
 def create_initial_collections_and_indexes():
     """Creates collections and unique indexes for data integrity."""
@@ -39,7 +113,55 @@ def create_initial_collections_and_indexes():
     print("✅ Index created for equipment (name).")
 
     # 4. Difficulties Collection - No unique index needed, simple list.
+
+    # 5. Secondary indexes backing the server's filters
+    for collection, keys, options in SECONDARY_INDEXES:
+        db[collection].create_index(keys, **options)
+        print(f"✅ Index created for {collection} ({', '.join(field for field, _ in keys)}).")
+
+    for collection, index_name in OBSOLETE_INDEXES:
+        if index_name in db[collection].index_information():
+            db[collection].drop_index(index_name)
+            print(f"✅ Dropped unused index {index_name} on {collection}.")
+
     print("--- Setup complete ---\n")
 
+def find_collscans(plan):
+    """Returns True if any stage in an explain plan is a COLLSCAN."""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(find_collscans(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(find_collscans(value) for value in plan)
+    return False
+
+def audit_query_plans():
+    """
+    Explains every query shape against the live database and flags COLLSCAN plans.
+    Returns the labels of the shapes that scan a whole collection.
+    """
+    db = get_db()
+    if db is None:
+        print("❌ Cannot audit query plans: Connection failed.")
+        return None
+
+    print("\n--- Auditing query plans ---")
+    collscans = []
+    for label, command in QUERY_SHAPES:
+        explain = db.command({"explain": command, "verbosity": "queryPlanner"})
+        if find_collscans(explain.get("queryPlanner", explain)):
+            collscans.append(label)
+            print(f"❌ COLLSCAN: {label}")
+        else:
+            print(f"✅ Indexed:  {label}")
+
+    print(f"--- Audit complete: {len(collscans)} collection scan(s) ---\n")
+    return collscans
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "explain":
+        # python database_setup.py explain
+        result = audit_query_plans()
+        sys.exit(1 if result is None or result else 0)
     create_initial_collections_and_indexes()
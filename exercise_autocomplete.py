@@ -0,0 +1,199 @@
+import bisect
+import os
+import threading
+from collections import Counter
+from btm_workout_cache import CatalogueIndex
+
+
+def normalize_name(name):
+    return " ".join(name.lower().split())
+
+
+def is_correctable(word):
+    """Numbers and other digit-bearing tokens are never spelling-corrected."""
+    return not any(c.isdigit() for c in word)
+
+
+def name_trigrams(text, partial=False):
+    """Trigrams of text padded at the start (and at the end unless it is a partial prefix)."""
+    padded = "  " + text + ("" if partial else " ")
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex(CatalogueIndex):
+    """
+    In-memory index of exercise names for type-ahead.
+
+    Two sorted key lists answer prefix lookups with a bisect: one keyed on the
+    whole name and one on every later word ("curl" finds "barbell curl").
+    When those return fewer names than requested, misspelt words are corrected
+    against the vocabulary of name words through a trigram index and the
+    lookups run again ("barbel cur" finds "barbell curl"). The vocabulary is a
+    few hundred words, so this stays an in-memory lookup. Like the sampler, the
+    index is loaded once per process, updated incrementally by the write
+    routes, and reloaded in the background after broad changes or when the
+    catalogue version moves.
+    """
+
+    def __init__(self, min_similarity=None):
+        super().__init__()
+        if min_similarity is None:
+            min_similarity = float(os.getenv("AUTOCOMPLETE_MIN_SIMILARITY", "0.5"))
+        self.min_similarity = min_similarity
+        self._counts = {}     # name -> number of exercises with that name
+        self._full = []       # sorted [(normalized name, name)]
+        self._words = []      # sorted [(normalized name from its 2nd, 3rd... word, name)]
+        self._vocab = Counter()  # word -> number of names containing it
+        self._trigrams = {}      # trigram -> {word, ...}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(name):
+        normalized = normalize_name(name)
+        words = normalized.split(" ")
+        word_keys = [(" ".join(words[i:]), name) for i in range(1, len(words))]
+        return (normalized, name), word_keys, set(words)
+
+    def load(self, db):
+        """Rebuilds the index from one query covered by unique_exercise_index."""
+        counts = Counter(
+            doc["name"] for doc in db.exercises.find({"name": {"$exists": True}}, {"_id": 0, "name": 1})
+            if isinstance(doc.get("name"), str)
+        )
+        full, words, vocab, trigrams = [], [], Counter(), {}
+        for name in counts:
+            full_key, word_keys, name_words = self._keys(name)
+            full.append(full_key)
+            words.extend(word_keys)
+            vocab.update(name_words)
+        for word in filter(is_correctable, vocab):
+            for gram in name_trigrams(word):
+                trigrams.setdefault(gram, set()).add(word)
+        full.sort()
+        words.sort()
+        with self._lock:
+            self._counts = dict(counts)
+            self._full = full
+            self._words = words
+            self._vocab = vocab
+            self._trigrams = trigrams
+
+    def add(self, name, version=None):
+        """Adds a name this worker wrote; version is what invalidate_exercise_caches() returned."""
+        self._add(name)
+        self.advance(version)
+
+    def remove(self, name, version=None):
+        self._remove(name)
+        self.advance(version)
+
+    def _add(self, name):
+        if not isinstance(name, str):
+            return
+        with self._lock:
+            if not self.loaded():
+                return
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if self._counts[name] > 1:
+                return
+            full_key, word_keys, name_words = self._keys(name)
+            bisect.insort(self._full, full_key)
+            for key in word_keys:
+                bisect.insort(self._words, key)
+            for word in name_words:
+                self._vocab[word] += 1
+                if self._vocab[word] == 1 and is_correctable(word):
+                    for gram in name_trigrams(word):
+                        self._trigrams.setdefault(gram, set()).add(word)
+
+    def _remove(self, name):
+        with self._lock:
+            count = self._counts.get(name)
+            if count is None:
+                return
+            if count > 1:
+                self._counts[name] = count - 1
+                return
+            del self._counts[name]
+            full_key, word_keys, name_words = self._keys(name)
+            for keys, key in [(self._full, full_key)] + [(self._words, key) for key in word_keys]:
+                i = bisect.bisect_left(keys, key)
+                if i < len(keys) and keys[i] == key:
+                    del keys[i]
+            for word in name_words:
+                self._vocab[word] -= 1
+                if self._vocab[word] > 0:
+                    continue
+                del self._vocab[word]
+                for gram in name_trigrams(word):
+                    words = self._trigrams.get(gram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._trigrams[gram]
+
+    @staticmethod
+    def _prefix_matches(keys, prefix, limit, seen):
+        matches = []
+        i = bisect.bisect_left(keys, (prefix,))
+        while i < len(keys) and len(matches) < limit and keys[i][0].startswith(prefix):
+            name = keys[i][1]
+            if name not in seen:
+                seen.add(name)
+                matches.append(name)
+            i += 1
+        return matches
+
+    def _correct_word(self, word, partial):
+        """
+        Returns the vocabulary word closest to word by trigram overlap, or word
+        itself if it is known (or, when partial, a prefix of a known word).
+        """
+        if word in self._vocab or len(word) < 3:
+            return word
+        if partial:
+            for keys in (self._full, self._words):
+                i = bisect.bisect_left(keys, (word,))
+                if i < len(keys) and keys[i][0].startswith(word):
+                    return word
+        grams = name_trigrams(word, partial=partial)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        best = None
+        for candidate, count in shared.items():
+            # A partial word only has to be covered; a whole word is compared both ways (Dice)
+            score = count / len(grams) if partial else 2 * count / (len(grams) + len(name_trigrams(candidate)))
+            if score >= self.min_similarity and (best is None or (-score, len(candidate), candidate) < best):
+                best = (-score, len(candidate), candidate)
+        return word if best is None else best[2]
+
+    def complete(self, db, prefix, limit=10):
+        """
+        Returns up to limit names: names starting with prefix, then names with a
+        later word starting with it, then the same lookups for the prefix with
+        misspelt words corrected.
+        """
+        self.ensure_current(db)
+
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            seen = set()
+            results = self._lookup(prefix, limit, seen)
+            if len(results) < limit:
+                words = prefix.split(" ")
+                corrected = " ".join(self._correct_word(word, partial=i == len(words) - 1) for i, word in enumerate(words))
+                if corrected != prefix:
+                    results += self._lookup(corrected, limit - len(results), seen)
+            return results
+
+    def _lookup(self, prefix, limit, seen):
+        results = self._prefix_matches(self._full, prefix, limit, seen)
+        if len(results) < limit:
+            results += self._prefix_matches(self._words, prefix, limit - len(results), seen)
+        return results
+
+
+name_index = NameIndex()
@@ -0,0 +1,30 @@
+import base64
+import json
+
+# Keyset pagination walks the unique_exercise_index in order. The refresh
+# upserts on the same fields, and database_setup.py audits the filter below.
+EXERCISE_KEY_FIELDS = ("name", "bodyPart", "equipment")
+
+
+def encode_exercise_cursor(exercise):
+    key = [exercise.get(field) for field in EXERCISE_KEY_FIELDS]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_exercise_cursor(token):
+    key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    if not isinstance(key, list) or len(key) != len(EXERCISE_KEY_FIELDS):
+        raise ValueError("Malformed cursor.")
+    return key
+
+
+def exercise_keyset_filter(key):
+    """Builds the filter for documents that sort strictly after key on (name, bodyPart, equipment)."""
+    clauses = []
+    for i, field in enumerate(EXERCISE_KEY_FIELDS):
+        # Missing/null values sort before strings, so "after null" means "not null"
+        clause = {f: key[j] for j, f in enumerate(EXERCISE_KEY_FIELDS[:i])}
+        clause[field] = {"$ne": None} if key[i] is None else {"$gt": key[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
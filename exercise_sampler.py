@@ -0,0 +1,104 @@
+import random
+import threading
+from btm_workout_cache import CatalogueIndex, get_catalogue_version
+from catalogue_replica import replica
+
+
+class ExerciseSampler(CatalogueIndex):
+    """
+    Per-bodyPart lists of exercise _ids used to draw random workouts.
+
+    Drawing N exercises picks N ids in memory and fetches them with one
+    _id-index lookup, instead of a $match + $sample collection scan. The
+    lists are loaded once per process, updated incrementally by the write
+    routes, and reloaded in the background after broad changes or when the
+    catalogue version moves (another worker's write).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._ids = {}        # bodyPart -> [_id, ...]
+        self._positions = {}  # bodyPart -> {_id: index into _ids[bodyPart]}
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """Rebuilds every list from one projected query over (_id, bodyPart)."""
+        ids = {}
+        for doc in db.exercises.find({"bodyPart": {"$exists": True}}, {"_id": 1, "bodyPart": 1}):
+            ids.setdefault(doc["bodyPart"], []).append(doc["_id"])
+        positions = {part: {doc_id: i for i, doc_id in enumerate(part_ids)} for part, part_ids in ids.items()}
+        with self._lock:
+            self._ids = ids
+            self._positions = positions
+
+    def add(self, doc_id, body_part, version=None):
+        """Adds an exercise this worker wrote; version is what invalidate_exercise_caches() returned."""
+        self._add(doc_id, body_part)
+        self.advance(version)
+
+    def remove(self, doc_id, body_part, version=None):
+        self._remove(doc_id, body_part)
+        self.advance(version)
+
+    def remove_body_part(self, body_part, version=None):
+        with self._lock:
+            self._ids.pop(body_part, None)
+            self._positions.pop(body_part, None)
+        self.advance(version)
+
+    def _add(self, doc_id, body_part):
+        with self._lock:
+            if not self.loaded() or body_part is None:
+                return
+            positions = self._positions.setdefault(body_part, {})
+            if doc_id in positions:
+                return
+            part_ids = self._ids.setdefault(body_part, [])
+            positions[doc_id] = len(part_ids)
+            part_ids.append(doc_id)
+
+    def _remove(self, doc_id, body_part):
+        with self._lock:
+            positions = self._positions.get(body_part)
+            if positions is None or doc_id not in positions:
+                return
+            # Swap with the last id so removal is O(1)
+            part_ids = self._ids[body_part]
+            index = positions.pop(doc_id)
+            last = part_ids.pop()
+            if index < len(part_ids):
+                part_ids[index] = last
+                positions[last] = index
+
+    def sample(self, db, body_part, count):
+        """Returns up to count distinct random exercises for body_part."""
+        current = self.ensure_current(db)
+
+        with self._lock:
+            part_ids = self._ids.get(body_part, [])
+            chosen = random.sample(part_ids, min(count, len(part_ids)))
+        if not chosen:
+            if current:
+                return []
+            # Another worker may have just added this bodyPart; draw from MongoDB until the reload lands
+            return list(db.exercises.aggregate([
+                {"$match": {"bodyPart": body_part}},
+                {"$sample": {"size": count}},
+                {"$project": {"_id": 0}},
+            ]))
+
+        if replica.ready_for(get_catalogue_version(db)):
+            docs = replica.find_by_ids(chosen)
+        else:
+            docs = db.exercises.find({"_id": {"$in": chosen}})
+        found = {doc["_id"]: doc for doc in docs}
+        if len(found) < len(chosen):
+            # Another worker deleted some of these; reload before the next draw
+            self.invalidate()
+        exercises = [found[doc_id] for doc_id in chosen if doc_id in found]
+        for exercise in exercises:
+            del exercise["_id"]
+        return exercises
+
+
+sampler = ExerciseSampler()
@@ -0,0 +1,191 @@
+import codecs
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+load_dotenv()
+
+EXERCISEDB_HOST = "exercisedb.p.rapidapi.com"
+EXERCISEDB_EXERCISES_URL = f"https://{EXERCISEDB_HOST}/exercises"
+
+# Paging and connection settings (overridable from .env)
+EXERCISEDB_PAGE_SIZE = int(os.getenv("EXERCISEDB_PAGE_SIZE", "100"))
+EXERCISEDB_CONCURRENCY = int(os.getenv("EXERCISEDB_CONCURRENCY", "4"))
+EXERCISEDB_CONNECT_TIMEOUT = float(os.getenv("EXERCISEDB_CONNECT_TIMEOUT", "5"))
+EXERCISEDB_READ_TIMEOUT = float(os.getenv("EXERCISEDB_READ_TIMEOUT", "30"))
+EXERCISEDB_MAX_RETRIES = int(os.getenv("EXERCISEDB_MAX_RETRIES", "5"))
+EXERCISEDB_BACKOFF_FACTOR = float(os.getenv("EXERCISEDB_BACKOFF_FACTOR", "0.5"))
+EXERCISEDB_CHUNK_SIZE = 64 * 1024
+
+_ARRAY_SEPARATORS = " \t\r\n,"
+_ELEMENT_ENDS = _ARRAY_SEPARATORS + "]"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class ExerciseDBFormatError(ValueError):
+    """The API answered with something other than a list of exercises."""
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parses a JSON array from an iterable of byte chunks and
+    yields its elements one at a time, so only the current chunk and the
+    element being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        if not started:
+            stripped = buffer.lstrip()
+            if not stripped:
+                continue
+            if stripped[0] != "[":
+                raise ExerciseDBFormatError(f"Expected a JSON array, got {stripped[:50]!r}.")
+            pos = len(buffer) - len(stripped) + 1
+            started = True
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _ARRAY_SEPARATORS:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                break
+            if end >= len(buffer) or buffer[end] not in _ELEMENT_ENDS:
+                # A number may continue in the next chunk ("12" + "3", "4." + "25");
+                # a complete array always has a separator or "]" after each element
+                if buffer[end:].strip(_NUMBER_CHARS):
+                    raise ExerciseDBFormatError(f"Unexpected {buffer[end:end + 50]!r} after an array element.")
+                break
+            pos = end
+            yield item
+
+    raise ExerciseDBFormatError("JSON array ended before its closing bracket.")
+
+
+def build_session(api_key, pool_size=None):
+    """
+    Creates a requests.Session with a connection pool sized for the fetch
+    concurrency. Failed GETs, 429s and 5xx answers are retried with
+    exponential backoff, honouring the API's Retry-After header.
+    """
+    retry = Retry(
+        total=EXERCISEDB_MAX_RETRIES,
+        backoff_factor=EXERCISEDB_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or EXERCISEDB_CONCURRENCY, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.headers.update({
+        "X-RapidAPI-Key": api_key,
+        "X-RapidAPI-Host": EXERCISEDB_HOST,
+    })
+    return session
+
+
+def stream_exercises(session, offset, limit):
+    """Requests one page (limit=0 for the whole catalogue) and yields exercises as they are parsed."""
+    with session.get(
+        EXERCISEDB_EXERCISES_URL,
+        params={"limit": limit, "offset": offset},
+        timeout=(EXERCISEDB_CONNECT_TIMEOUT, EXERCISEDB_READ_TIMEOUT),
+        stream=True,
+    ) as response:
+        response.raise_for_status() # Must be 200 OK
+        yield from iter_json_array(response.iter_content(chunk_size=EXERCISEDB_CHUNK_SIZE))
+
+
+def fetch_page(session, offset, limit):
+    """Fetches one page of exercises."""
+    page = list(stream_exercises(session, offset, limit))
+    print(f"API PAGE offset={offset}: {len(page)} items")
+    return page
+
+
+def iter_exercise_pages(api_key, page_size=None, concurrency=None):
+    """
+    Yields pages of exercises as they arrive, keeping up to `concurrency`
+    page requests in flight. Paging stops after the first short page.
+
+    Pages are yielded in completion order, so the caller can write one page
+    while the next ones are still downloading.
+    """
+    page_size = page_size or EXERCISEDB_PAGE_SIZE
+    concurrency = concurrency or EXERCISEDB_CONCURRENCY
+    session = build_session(api_key, pool_size=concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="exercisedb")
+    in_flight = set()
+    next_offset = 0
+    exhausted = False
+
+    def schedule():
+        nonlocal next_offset
+        while not exhausted and len(in_flight) < concurrency:
+            in_flight.add(executor.submit(fetch_page, session, next_offset, page_size))
+            next_offset += page_size
+
+    try:
+        schedule()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                page = future.result()
+                if len(page) < page_size:
+                    exhausted = True
+                if page:
+                    yield page
+            schedule()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=False)
+        session.close()
+
+
+def iter_exercises(api_key, page_size=None, concurrency=None):
+    """
+    Yields individual exercises from the API.
+
+    With page_size=0 the whole catalogue is requested at once and parsed
+    straight off the response stream; otherwise pages are fetched
+    concurrently by iter_exercise_pages().
+    """
+    if page_size is None:
+        page_size = EXERCISEDB_PAGE_SIZE
+    first = True
+    if page_size == 0:
+        session = build_session(api_key, pool_size=1)
+        try:
+            for exercise in stream_exercises(session, 0, 0):
+                if first:
+                    print(f"API FIRST ITEM: {json.dumps(exercise)[:200]}")
+                    first = False
+                yield exercise
+        finally:
+            session.close()
+        return
+
+    for page in iter_exercise_pages(api_key, page_size=page_size, concurrency=concurrency):
+        if first:
+            print(f"API FIRST ITEM: {json.dumps(page[0])[:200]}")
+            first = False
+        yield from page
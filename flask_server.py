@@ -1,16 +1,74 @@
+import functools
+import hmac
 import json
 import random
-from flask import Flask, jsonify, request
+import re
+from flask import Flask, Response, jsonify, make_response, request, stream_with_context
 from flask_cors import CORS, cross_origin # <-- Keep CORS and Import cross_origin
-from btm_workout_db_connect import get_db, connect_db
-from database_refresh import insert_exercises_if_not_exist
-from pymongo.errors import DuplicateKeyError, BulkWriteError
+from btm_workout_db_connect import get_db, connect_db, connection_status
+from database_refresh_jobs import start_refresh_job, get_refresh_job
+from btm_workout_cache import cached_distinct, get_catalogue_version, invalidate_exercise_caches, taxonomy_cache
+from exercise_sampler import sampler
+from exercise_autocomplete import name_index
+from btm_workout_compression import compress_response, compressed_cache, etag_variants
+from btm_workout_metrics import init_metrics, render_metrics
+from btm_workout_json import FastJSONProvider
+from catalogue_snapshot import CATALOGUE_SNAPSHOT_ENABLED, serve_catalogue_snapshot
+from catalogue_replica import CATALOGUE_REPLICA_ENABLED, replica, start_catalogue_replica
+from exercise_pagination import EXERCISE_KEY_FIELDS, decode_exercise_cursor, encode_exercise_cursor, exercise_keyset_filter
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure, PyMongoError
 import os
 
 # --- Initialization ---
 app = Flask(__name__)
+# orjson-backed JSON encoding (stdlib fallback) that also understands ObjectId and datetimes
+app.json = FastJSONProvider(app)
 # NOTE: The global CORS(app) is REMOVED. @cross_origin is used on each route for guaranteed functionality.
 
+# Clients may reuse a cached catalogue response for this long before revalidating with If-None-Match
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "0"))
+
+# --- HTTP Caching ---
+
+def catalogue_etag(view):
+    """
+    Tags successful GET responses with the catalogue version as a strong ETag
+    and answers a matching If-None-Match with 304 before the view runs.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        db = get_db()
+        if db is None:
+            return view(*args, **kwargs)
+        try:
+            # Read before the view runs, so a concurrent write can only make the ETag older than the body
+            version = str(get_catalogue_version(db))
+        except PyMongoError:
+            return view(*args, **kwargs)
+
+        # A compressed response carries a per-encoding variant of the version ETag
+        matched = next((tag for tag in etag_variants(version) if request.if_none_match.contains_weak(tag)), None)
+        if matched is not None:
+            response = Response(status=304)
+            response.set_etag(matched)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            # Views serving pre-encoded bodies set their own ETag variant
+            if response.get_etag()[0] is None:
+                response.set_etag(version)
+        response.headers['Cache-Control'] = f"public, max-age={API_CACHE_MAX_AGE}, must-revalidate"
+        return response
+    return wrapper
+
+# Per-route latency, MongoDB time and payload size; registered first so it sees the compressed size
+init_metrics(app, caches={"taxonomy": taxonomy_cache, "compressed": compressed_cache}, connection_status=connection_status)
+
+# Compresses large JSON bodies (gzip, or brotli when installed) after every request
+app.after_request(compress_response)
+
 # --- API Routes (v1) ---
 
 @app.route('/api/v1/insert_exercise', methods=['POST'])
@@ -24,14 +82,17 @@ def api_insert_exercise():
         data = request.json
         exercises_collection = db['exercises']
 
-        if not all(k in data for k in ('name', 'bodyPart', 'equipment', 'target')):
+        if not is_valid_exercise(data):
             return jsonify({"error": "Missing required fields."}), 400
             
         data.pop('category', None) # Clean up potential extra fields
 
         result = exercises_collection.insert_one(data)
+        version = invalidate_exercise_caches()
+        sampler.add(result.inserted_id, data.get('bodyPart'), version)
+        name_index.add(data.get('name'), version)
 
-        return jsonify({"message": "Exercise inserted successfully", "id": str(result.inserted_id)})
+        return jsonify({"message": "Exercise inserted successfully", "id": result.inserted_id})
     
     except DuplicateKeyError:
         return jsonify({"error": "An exercise with this name, body part, and equipment already exists."}), 409
@@ -40,6 +101,116 @@ def api_insert_exercise():
         print(f"Error inserting exercise: {e}")
         return jsonify({"error": "Failed to insert exercise."}), 500
 
+# --- Bulk insert ---
+
+REQUIRED_EXERCISE_FIELDS = ('name', 'bodyPart', 'equipment', 'target')
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
+BULK_INSERT_MAX_ITEMS = int(os.getenv("BULK_INSERT_MAX_ITEMS", "10000"))
+DUPLICATE_KEY_ERROR = 11000
+
+def is_valid_exercise(data):
+    return isinstance(data, dict) and all(k in data for k in REQUIRED_EXERCISE_FIELDS)
+
+def read_bulk_items():
+    """
+    Returns the request's exercises: the list from a JSON array, or an iterator
+    reading an NDJSON body line by line from the stream.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        return iter_ndjson_items()
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array or an application/x-ndjson body.")
+    return data
+
+def iter_ndjson_items():
+    for line in request.stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as invalid for this line
+            yield None
+
+def insert_exercise_batch(collection, batch, results):
+    """insert_many(ordered=False) for [(index, exercise)], recording one result per item."""
+    documents = [exercise for _, exercise in batch]
+    failed = {}
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+
+    inserted = []
+    for position, (index, exercise) in enumerate(batch):
+        error = failed.get(position)
+        if error is None:
+            results.append({"index": index, "status": "inserted", "id": exercise['_id']})
+            inserted.append(exercise)
+        elif error.get('code') == DUPLICATE_KEY_ERROR:
+            results.append({"index": index, "status": "duplicate", "name": exercise.get('name')})
+        else:
+            results.append({"index": index, "status": "error", "error": error.get('errmsg')})
+    return inserted
+
+# API endpoint to insert many exercises at once (JSON array or NDJSON body)
+@app.route('/api/v1/exercises/bulk', methods=['POST'])
+@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+def api_bulk_insert_exercises():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+
+    try:
+        items = read_bulk_items()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit_error = f"At most {BULK_INSERT_MAX_ITEMS} exercises per request."
+    # A JSON array is rejected whole before anything is written
+    if isinstance(items, list) and len(items) > BULK_INSERT_MAX_ITEMS:
+        return jsonify({"error": limit_error}), 413
+
+    results = []
+    inserted = []
+    batch = []
+    truncated = False
+    try:
+        for index, data in enumerate(items):
+            if index >= BULK_INSERT_MAX_ITEMS:
+                # NDJSON is written as it streams in; stop here and report what was processed
+                truncated = True
+                break
+            if not is_valid_exercise(data):
+                results.append({"index": index, "status": "invalid", "error": "Missing required fields."})
+                continue
+            data.pop('category', None) # Same cleanup as insert_exercise
+            batch.append((index, data))
+            if len(batch) >= BULK_INSERT_BATCH_SIZE:
+                inserted += insert_exercise_batch(db.exercises, batch, results)
+                batch = []
+        if batch:
+            inserted += insert_exercise_batch(db.exercises, batch, results)
+    except Exception as e:
+        print(f"Error bulk inserting exercises: {e}")
+        return jsonify({"error": "Failed to insert exercises.", "results": results}), 500
+    finally:
+        # Earlier batches may be written even if a later one failed
+        if inserted:
+            version = invalidate_exercise_caches()
+            for exercise in inserted:
+                sampler.add(exercise['_id'], exercise.get('bodyPart'), version)
+                name_index.add(exercise.get('name'), version)
+
+    results.sort(key=lambda result: result['index'])
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ("inserted", "duplicate", "invalid", "error")}
+    body = {"message": f"{counts['inserted']} exercises inserted.", **counts, "results": results}
+    if truncated:
+        body["error"] = f"{limit_error} Only the first {BULK_INSERT_MAX_ITEMS} were processed."
+        return jsonify(body), 413
+    return jsonify(body)
+
 # API endpoint to get 3 random exercises for a selected body part
 @app.route('/api/v1/get_random_exercises', methods=['POST'])
 @cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
@@ -58,16 +229,9 @@ def api_get_random_exercises():
     if not selected_body_part:
         return jsonify({"error": "No body part provided."}), 400
         
-    match_stage = {"$match": {"bodyPart": selected_body_part}}
-        
     try:
-        pipeline = [
-            match_stage,
-            {"$sample": {"size": int(num_exercises)}},
-            {"$project": {"_id": 0}} # Exclude MongoDB's _id field
-        ]
-
-        random_exercises = list(db.exercises.aggregate(pipeline))
+        # Draws ids from the in-memory per-bodyPart lists, then fetches them by _id
+        random_exercises = sampler.sample(db, selected_body_part, int(num_exercises))
 
         if not random_exercises:
              return jsonify({"error": f"No exercises found for body part: {selected_body_part}."}), 404
@@ -78,26 +242,47 @@ def api_get_random_exercises():
         return jsonify({"error": "Failed to retrieve exercises."}), 500
 
 # API endpoint to refresh the database with new exercises
+# The refresh runs as a background job; poll the returned status_url for progress
 @app.route('/api/v1/refresh_db', methods=['POST'])
 @cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
 def api_refresh_db():
     try:
-        # Calls the external API logic from database_refresh.py
-        count = insert_exercises_if_not_exist() 
-        return jsonify({"message": f"Database refresh complete. {count} new exercises added."})
+        job, created = start_refresh_job()
+        message = "Database refresh started." if created else "A database refresh is already running."
+        return jsonify({
+            "message": message,
+            "status_url": f"/api/v1/refresh_db/{job.id}",
+            **job.to_dict()
+        }), 202
     except Exception as e:
         return jsonify({"error": f"Failed to refresh database: {e}"}), 500
 
+# API endpoint to poll the progress of a refresh job
+@app.route('/api/v1/refresh_db/<string:job_id>', methods=['GET'])
+@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+def api_refresh_db_status(job_id):
+    try:
+        job = get_refresh_job(job_id)
+    except Exception as e:
+        return jsonify({"error": f"Failed to read refresh job: {e}"}), 500
+    if job is None:
+        return jsonify({"error": "Refresh job not found."}), 404
+    return jsonify(job.to_dict())
+
 # API endpoint to get a single exercise by its name
 @app.route('/api/v1/exercise/<string:name>', methods=['GET'])
-@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
 def api_get_exercise_details(name):
     db = get_db()
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
     try:
-        exercises_collection = db['exercises']
-        exercise = exercises_collection.find_one({"name": name}, {'_id': 0})
+        if replica.ready_for(get_catalogue_version(db)):
+            exercise = replica.find_by_name(name)
+        else:
+            exercises_collection = db['exercises']
+            exercise = exercises_collection.find_one({"name": name}, {'_id': 0})
         
         if exercise:
             return jsonify(exercise)
@@ -120,7 +305,7 @@ def api_add_body_part():
         if not name:
             return jsonify({"error": "Missing 'name' field."}), 400
         result = db.body_parts.insert_one({"name": name})
-        return jsonify({"message": "Body part added successfully", "id": str(result.inserted_id)})
+        return jsonify({"message": "Body part added successfully", "id": result.inserted_id})
     except DuplicateKeyError:
         return jsonify({"error": "This body part already exists."}), 409
     except Exception as e:
@@ -139,7 +324,7 @@ def api_add_equipment():
         if not name:
             return jsonify({"error": "Missing 'name' field."}), 400
         result = db.equipment.insert_one({"name": name})
-        return jsonify({"message": "Equipment added successfully", "id": str(result.inserted_id)})
+        return jsonify({"message": "Equipment added successfully", "id": result.inserted_id})
     except DuplicateKeyError:
         return jsonify({"error": "This equipment already exists."}), 409
     except Exception as e:
@@ -153,14 +338,83 @@ def api_delete_exercise(name):
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
     try:
-        result = db.exercises.delete_one({"name": name})
-        if result.deleted_count == 1:
+        deleted = db.exercises.find_one_and_delete({"name": name}, projection={"_id": 1, "bodyPart": 1})
+        if deleted is not None:
+            version = invalidate_exercise_caches()
+            sampler.remove(deleted["_id"], deleted.get("bodyPart"), version)
+            name_index.remove(name, version)
             return jsonify({"message": f"Exercise '{name}' deleted successfully."})
         else:
             return jsonify({"error": "Exercise not found."}), 404
     except Exception as e:
         return jsonify({"error": f"Failed to delete exercise: {str(e)}"}), 500
 
+# API endpoint to delete many exercises in one call
+# Body: {"names": [...]} or {"filter": {"bodyPart": ..., "equipment": ..., "difficulty": ..., "target": ...}},
+# plus "dry_run": true to only count the matches. Filter values may be a string or a list of strings.
+BULK_DELETE_FILTER_FIELDS = ('bodyPart', 'equipment', 'difficulty', 'target')
+BULK_DELETE_MAX_NAMES = int(os.getenv("BULK_DELETE_MAX_NAMES", "10000"))
+
+def build_bulk_delete_query(data):
+    names = data.get('names')
+    filters = data.get('filter')
+    if (names is None) == (filters is None):
+        raise ValueError("Provide exactly one of 'names' or 'filter'.")
+
+    if names is not None:
+        if not isinstance(names, list) or not names or not all(isinstance(n, str) for n in names):
+            raise ValueError("'names' must be a non-empty list of strings.")
+        if len(names) > BULK_DELETE_MAX_NAMES:
+            raise ValueError(f"At most {BULK_DELETE_MAX_NAMES} names per request.")
+        # name is the prefix of unique_exercise_index
+        return {"name": {"$in": names}}
+
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError("'filter' must be a non-empty object.")
+    query = {}
+    for field, value in filters.items():
+        if field not in BULK_DELETE_FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on '{field}'. Allowed: {', '.join(BULK_DELETE_FILTER_FIELDS)}.")
+        if isinstance(value, str):
+            query[field] = value
+        elif isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+            query[field] = {"$in": value}
+        else:
+            raise ValueError(f"'{field}' must be a string or a non-empty list of strings.")
+    return query
+
+@app.route('/api/v1/exercises/bulk_delete', methods=['POST'])
+@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+def api_bulk_delete_exercises():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object."}), 400
+        query = build_bulk_delete_query(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if data.get('dry_run'):
+            # Runs $match + $group. The count comes from index keys alone only when the filter's
+            # fields are a prefix of one index (names; bodyPart[, equipment[, target]];
+            # equipment[, target]; difficulty; target). Other combinations, e.g. bodyPart with
+            # difficulty, also fetch every matching document.
+            matched = db.exercises.count_documents(query)
+            return jsonify({"message": f"{matched} exercises would be deleted.", "dry_run": True, "matched": matched})
+
+        result = db.exercises.delete_many(query)
+        if result.deleted_count:
+            invalidate_exercise_caches()
+            sampler.invalidate()
+            name_index.invalidate()
+        return jsonify({"message": f"{result.deleted_count} exercises deleted.", "dry_run": False, "deleted": result.deleted_count})
+    except Exception as e:
+        return jsonify({"error": f"Failed to delete exercises: {str(e)}"}), 500
+
 # API endpoint to delete a body part by its name
 @app.route('/api/v1/delete_body_part/<string:name>', methods=['DELETE'])
 @cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
@@ -173,6 +427,10 @@ def api_delete_body_part(name):
         
         # Also delete associated exercises
         exercises_deleted = db.exercises.delete_many({"bodyPart": name})
+        if exercises_deleted.deleted_count:
+            version = invalidate_exercise_caches()
+            sampler.remove_body_part(name, version)
+            name_index.invalidate()
 
         if result.deleted_count == 1:
             return jsonify({
@@ -195,6 +453,10 @@ def api_delete_equipment(name):
 
         # Also delete associated exercises
         exercises_deleted = db.exercises.delete_many({"equipment": name})
+        if exercises_deleted.deleted_count:
+            invalidate_exercise_caches()
+            sampler.invalidate()
+            name_index.invalidate()
 
         if result.deleted_count == 1:
             return jsonify({
@@ -207,57 +469,379 @@ def api_delete_equipment(name):
 
 # API endpoint to get a list of all body parts
 @app.route('/api/v1/body_parts_list', methods=['GET'])
-@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
 def api_body_parts_list():
     db = get_db()
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
     try:
-        # Use MongoDB's distinct to fetch unique body parts from the exercises collection
-        body_parts = db.exercises.distinct('bodyPart')
+        # Use MongoDB's distinct to fetch unique body parts from the exercises collection (cached until the next write)
+        body_parts = cached_distinct(db, 'bodyPart', replica)
         return jsonify(body_parts)
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve body parts list: {str(e)}"}), 500
 
 # API endpoint to get a list of all equipment
 @app.route('/api/v1/equipment_list', methods=['GET'])
-@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
 def api_equipment_list():
     db = get_db()
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
     try:
-        equipment_list = db.exercises.distinct('equipment')
+        equipment_list = cached_distinct(db, 'equipment', replica)
         return jsonify(equipment_list)
     except Exception as e:
         return jsonify({"error": "Failed to retrieve equipment list: {str(e)}"}), 500
 
+# --- Exercise list pagination helpers ---
+
+EXERCISES_PAGE_MAX = int(os.getenv("EXERCISES_PAGE_MAX", "1000"))
+EXERCISES_CURSOR_BATCH = 200
+FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+def parse_int_param(name, default=None):
+    """
+    Reads an integer query parameter. request.args.get(name, type=int) turns
+    bad input into the default, so limit=abc would mean "no limit".
+    """
+    raw = request.args.get(name)
+    if raw is None or raw.strip() == '':
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer.")
+
+def parse_fields_param(raw):
+    """Returns the requested field names, or None for all fields."""
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    if not fields or not all(FIELD_NAME_PATTERN.match(f) for f in fields):
+        raise ValueError("Invalid 'fields' parameter.")
+    return fields
+
+def project_exercise(exercise, fields):
+    if fields is None:
+        return exercise
+    return {f: exercise[f] for f in fields if f in exercise}
+
 # API endpoint to get a list of all exercises
+# Optional query parameters:
+#   limit=<n>            page size; the response becomes {"exercises": [...], "next_after": <cursor or null>}
+#   after=<cursor>       resume after the cursor returned as next_after
+#   fields=a,b,c         only return these fields
+#   format=ndjson        stream one document per line (a final {"next_after": ...} line is added when paging)
+#   stream=true          stream the JSON response instead of building it in memory
 @app.route('/api/v1/exercises_list', methods=['GET'])
-@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
 def api_exercises_list():
     db = get_db()
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
+
+    if CATALOGUE_SNAPSHOT_ENABLED and not request.args:
+        # The plain full-catalogue request is served from the pre-serialized snapshot when it is built
+        try:
+            response = serve_catalogue_snapshot(db, get_catalogue_version(db), app.json.dumps)
+            if response is not None:
+                return response
+        except Exception as e:
+            print(f"Catalogue snapshot unavailable: {e}")
+
+    if not request.args and replica.ready_for(get_catalogue_version(db)):
+        return jsonify(replica.exercises())
+
     try:
-        exercises_list = list(db.exercises.find({}, {"_id": 0}))
-        return jsonify(exercises_list)
+        limit = parse_int_param('limit')
+        if limit is not None and not 0 < limit <= EXERCISES_PAGE_MAX:
+            return jsonify({"error": f"'limit' must be between 1 and {EXERCISES_PAGE_MAX}."}), 400
+        after = request.args.get('after')
+        query = exercise_keyset_filter(decode_exercise_cursor(after)) if after else {}
+        fields = parse_fields_param(request.args.get('fields'))
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({"error": "'format' must be 'json' or 'ndjson'."}), 400
+        stream = output_format == 'ndjson' or request.args.get('stream', '').lower() in ('1', 'true')
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid pagination parameters: {e}"}), 400
+
+    paginated = limit is not None or after is not None
+    projection = {"_id": 0}
+    if fields is not None:
+        # The key fields are always read so the next cursor can be built
+        projection.update({f: 1 for f in set(fields) | set(EXERCISE_KEY_FIELDS)})
+
+    try:
+        cursor = db.exercises.find(query, projection, batch_size=EXERCISES_CURSOR_BATCH)
+        if paginated:
+            cursor = cursor.sort([(f, ASCENDING) for f in EXERCISE_KEY_FIELDS])
+        if limit is not None:
+            # One extra document tells us whether another page exists
+            cursor = cursor.limit(limit + 1)
+
+        if not stream:
+            exercises_list = list(cursor)
+            next_after = None
+            if limit is not None and len(exercises_list) > limit:
+                exercises_list = exercises_list[:limit]
+                next_after = encode_exercise_cursor(exercises_list[-1])
+            exercises_list = [project_exercise(e, fields) for e in exercises_list]
+            if paginated:
+                return jsonify({"exercises": exercises_list, "next_after": next_after})
+            return jsonify(exercises_list)
+
+        return Response(
+            stream_with_context(generate_exercises_stream(cursor, limit, fields, output_format, paginated)),
+            mimetype='application/x-ndjson' if output_format == 'ndjson' else 'application/json',
+        )
     except Exception as e:
-        return jsonify({"error": "Failed to retrieve exercises list: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to retrieve exercises list: {str(e)}"}), 500
+
+def generate_exercises_stream(cursor, limit, fields, output_format, paginated):
+    """Writes documents out as the cursor produces them so only one batch is held in memory."""
+    ndjson = output_format == 'ndjson'
+    if not ndjson:
+        yield '{"exercises":[' if paginated else '['
+
+    sent = 0
+    last = None
+    next_after = None
+    for exercise in cursor:
+        if limit is not None and sent == limit:
+            next_after = encode_exercise_cursor(last)
+            break
+        if ndjson:
+            yield app.json.dumps(project_exercise(exercise, fields)) + '\n'
+        else:
+            yield (',' if sent else '') + app.json.dumps(project_exercise(exercise, fields))
+        last = exercise
+        sent += 1
+
+    if ndjson:
+        if paginated and next_after is not None:
+            yield app.json.dumps({"next_after": next_after}) + '\n'
+    elif paginated:
+        yield '],"next_after":' + app.json.dumps(next_after) + '}'
+    else:
+        yield ']'
 
 # API endpoint to get a list of all difficulties
 @app.route('/api/v1/difficulties', methods=['GET'])
-@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
 def api_difficulties():
     db = get_db()
     if db is None:
         return jsonify({"error": "Database not connected."}), 500
     try:
-        difficulties = db.exercises.distinct('difficulty')
+        difficulties = cached_distinct(db, 'difficulty', replica)
         return jsonify(difficulties)
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve difficulties: {str(e)}"}), 500
 
+# --- Faceted query ---
+FACET_FIELDS = ('bodyPart', 'equipment', 'target', 'difficulty', 'category')
+EXERCISES_QUERY_LIMIT_DEFAULT = 50
+
+def facet_count_stages():
+    """$facet sub-pipelines counting the values of each facet field, most common first."""
+    # $sortByCount with a stable order for ties
+    return {
+        field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+        for field in FACET_FIELDS
+    }
+
+def facet_buckets(result):
+    return {
+        field: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result[field] if bucket["_id"] is not None]
+        for field in FACET_FIELDS
+    }
+
+# API endpoint to filter exercises on any combination of the facet fields, with per-facet counts
+# Query parameters:
+#   bodyPart=, equipment=, target=, difficulty=, category=   repeat a parameter to match any of its values
+#   limit=<n>, after=<cursor>, fields=a,b,c                  as for /api/v1/exercises_list
+# Response: {"exercises": [...], "next_after": <cursor or null>, "total": n,
+#            "facets": {"bodyPart": [{"value": ..., "count": n}, ...], ...}}
+# Facet counts describe all matches of the filters (not just this page), most common value first.
+@app.route('/api/v1/exercises/query', methods=['GET'])
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
+def api_query_exercises():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+
+    match = {}
+    for field in FACET_FIELDS:
+        values = request.args.getlist(field)
+        if len(values) == 1:
+            match[field] = values[0]
+        elif values:
+            match[field] = {"$in": values}
+    try:
+        limit = parse_int_param('limit', EXERCISES_QUERY_LIMIT_DEFAULT)
+        if not 0 < limit <= EXERCISES_PAGE_MAX:
+            return jsonify({"error": f"'limit' must be between 1 and {EXERCISES_PAGE_MAX}."}), 400
+        after = request.args.get('after')
+        page_match = exercise_keyset_filter(decode_exercise_cursor(after)) if after else {}
+        fields = parse_fields_param(request.args.get('fields'))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid query parameters: {e}"}), 400
+
+    projection = {"_id": 0}
+    if fields is not None:
+        projection.update({f: 1 for f in set(fields) | set(EXERCISE_KEY_FIELDS)})
+
+    # The leading $match is the only stage that can use an index; every facet reads its output
+    facets = {
+        "exercises": [
+            {"$match": page_match},
+            {"$sort": {f: ASCENDING for f in EXERCISE_KEY_FIELDS}},
+            # One extra document tells us whether another page exists
+            {"$limit": limit + 1},
+            {"$project": projection},
+        ],
+        "total": [{"$count": "count"}],
+        **facet_count_stages(),
+    }
+
+    try:
+        result = next(db.exercises.aggregate([{"$match": match}, {"$facet": facets}]))
+    except Exception as e:
+        return jsonify({"error": f"Failed to query exercises: {str(e)}"}), 500
+
+    exercises_list = result["exercises"]
+    next_after = None
+    if len(exercises_list) > limit:
+        exercises_list = exercises_list[:limit]
+        next_after = encode_exercise_cursor(exercises_list[-1])
+    return jsonify({
+        "exercises": [project_exercise(e, fields) for e in exercises_list],
+        "next_after": next_after,
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "facets": facet_buckets(result),
+    })
+
+# --- Bootstrap ---
+
+def load_bootstrap(db, version):
+    """Everything the client needs on first paint, from one $facet aggregation over the catalogue."""
+    result = next(db.exercises.aggregate([{"$facet": {"total": [{"$count": "count"}], **facet_count_stages()}}]))
+    buckets = facet_buckets(result)
+    lists = {field: sorted((bucket["value"] for bucket in buckets[field]), key=str) for field in FACET_FIELDS}
+    return {
+        "version": str(version),
+        # Same lists as body_parts_list / equipment_list / difficulties, plus targets and categories
+        "bodyParts": lists['bodyPart'],
+        "equipment": lists['equipment'],
+        "targets": lists['target'],
+        "difficulties": lists['difficulty'],
+        "categories": lists['category'],
+        "counts": {
+            "exercises": result["total"][0]["count"] if result["total"] else 0,
+            **{field: {bucket["value"]: bucket["count"] for bucket in buckets[field]} for field in FACET_FIELDS},
+        },
+    }
+
+# API endpoint returning the taxonomy lists, catalogue version and counts in one payload
+# Built once per catalogue version per worker and tagged with the catalogue ETag.
+@app.route('/api/v1/bootstrap', methods=['GET'])
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
+def api_bootstrap():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+    try:
+        version = get_catalogue_version(db)
+        payload = taxonomy_cache.get_or_load(("bootstrap", version), lambda: load_bootstrap(db, version))
+        return jsonify(payload)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load bootstrap data: {str(e)}"}), 500
+
+# --- Search ---
+SEARCH_LIMIT_DEFAULT = 20
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", "100"))
+SEARCH_QUERY_MAX_LENGTH = 200
+# MongoDB error code when a $text query finds no text index
+INDEX_NOT_FOUND = 27
+
+# API endpoint to search exercises by name, target, secondaryMuscles and instructions
+# Query parameters: q=<words or "phrase">, limit=<n>, fields=a,b,c
+# Results are ranked by the weighted exercise_text_search index (name counts most) and carry their "score".
+@app.route('/api/v1/search', methods=['GET'])
+@cross_origin(origins=['https://cspower5.github.io'], expose_headers=['ETag']) # <--- CORS FIX
+@catalogue_etag
+def api_search_exercises():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "Missing 'q' parameter."}), 400
+    if len(q) > SEARCH_QUERY_MAX_LENGTH:
+        return jsonify({"error": f"'q' must be at most {SEARCH_QUERY_MAX_LENGTH} characters."}), 400
+    try:
+        limit = parse_int_param('limit', SEARCH_LIMIT_DEFAULT)
+        if not 0 < limit <= SEARCH_LIMIT_MAX:
+            return jsonify({"error": f"'limit' must be between 1 and {SEARCH_LIMIT_MAX}."}), 400
+        fields = parse_fields_param(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    projection = {"_id": 0, "score": {"$meta": "textScore"}}
+    if fields is not None:
+        projection.update({f: 1 for f in fields if f != 'score'})
+
+    try:
+        cursor = (db.exercises.find({"$text": {"$search": q}}, projection)
+                  .sort([("score", {"$meta": "textScore"})])
+                  .limit(limit))
+        return jsonify({"query": q, "results": list(cursor)})
+    except OperationFailure as e:
+        if e.code == INDEX_NOT_FOUND:
+            return jsonify({"error": "Search index missing; run database_setup.py."}), 503
+        return jsonify({"error": f"Failed to search exercises: {str(e)}"}), 500
+    except Exception as e:
+        return jsonify({"error": f"Failed to search exercises: {str(e)}"}), 500
+
+# --- Autocomplete ---
+AUTOCOMPLETE_LIMIT_DEFAULT = 10
+AUTOCOMPLETE_LIMIT_MAX = 50
+AUTOCOMPLETE_PREFIX_MAX_LENGTH = 100
+
+# API endpoint for exercise name type-ahead: ?prefix=<typed text>&limit=<n>
+# Answered from this worker's in-memory name index; names starting with the prefix come first,
+# then names with a later word starting with it, then close misspellings.
+@app.route('/api/v1/autocomplete', methods=['GET'])
+@cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
+def api_autocomplete():
+    db = get_db()
+    if db is None:
+        return jsonify({"error": "Database not connected."}), 500
+
+    prefix = request.args.get('prefix', '')
+    if len(prefix) > AUTOCOMPLETE_PREFIX_MAX_LENGTH:
+        return jsonify({"error": f"'prefix' must be at most {AUTOCOMPLETE_PREFIX_MAX_LENGTH} characters."}), 400
+    try:
+        limit = parse_int_param('limit', AUTOCOMPLETE_LIMIT_DEFAULT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 0 < limit <= AUTOCOMPLETE_LIMIT_MAX:
+        return jsonify({"error": f"'limit' must be between 1 and {AUTOCOMPLETE_LIMIT_MAX}."}), 400
+
+    try:
+        return jsonify({"prefix": prefix, "results": name_index.complete(db, prefix, limit)})
+    except Exception as e:
+        return jsonify({"error": f"Failed to autocomplete: {str(e)}"}), 500
+
 # --- Error Handling ---
 
 @app.errorhandler(404)
@@ -275,12 +859,33 @@ def internal_error(error):
 @app.route('/api/v1/health', methods=['GET'])
 @cross_origin(origins=['https://cspower5.github.io']) # <--- CORS FIX
 def api_health_check():
-    return jsonify({"status": "ok", "message": "API is running and healthy."}), 200
+    # Reports the tracked connection state; this never makes a round trip to MongoDB
+    return jsonify({
+        "status": "ok",
+        "message": "API is running and healthy.",
+        "database": connection_status(),
+        "replica": replica.status() if CATALOGUE_REPLICA_ENABLED else {"enabled": False},
+    }), 200
+
+# --- Metrics ---
+# Scrapers send "Authorization: Bearer $METRICS_TOKEN"; without a token configured the route is off
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.route('/api/v1/metrics', methods=['GET'])
+def api_metrics():
+    if not METRICS_TOKEN:
+        return jsonify({"error": "Metrics are disabled."}), 404
+    supplied = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}".encode()):
+        return jsonify({"error": "Unauthorized."}), 401
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
 # --- Run Server (Production/Development) ---
 if __name__ == '__main__':
     # Initial connection attempt when running locally
     connect_db() 
+    start_catalogue_replica()
     app.run(debug=True, port=5000)
 
 
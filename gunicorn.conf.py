@@ -0,0 +1,84 @@
+"""
+Gunicorn settings for the Procfile deployment.
+
+Everything can be overridden from the environment:
+  PORT                    port to bind (set by the host)
+  WEB_CONCURRENCY         worker processes (default: 2 x CPUs + 1, capped by GUNICORN_MAX_WORKERS)
+  GUNICORN_MAX_WORKERS    upper bound for the default worker count (default 4)
+  GUNICORN_WORKER_CLASS   gthread (default), gevent or sync
+  GUNICORN_THREADS        threads per gthread worker (default 4)
+  GUNICORN_CONNECTIONS    concurrent connections per gevent worker (default 100)
+  GUNICORN_PRELOAD        import the app once in the master before forking (default true, ignored for gevent)
+  GUNICORN_TIMEOUT        seconds before a silent worker is restarted (default 60)
+  PROMETHEUS_MULTIPROC_DIR where workers write metrics for /api/v1/metrics to merge (default: a dir in /tmp)
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv(
+    "WEB_CONCURRENCY",
+    min(multiprocessing.cpu_count() * 2 + 1, int(os.getenv("GUNICORN_MAX_WORKERS", "4"))),
+))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_CONNECTIONS", "100"))
+
+# gevent has to monkey-patch before the app (and pymongo) is imported, which preloading would prevent
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true") and worker_class != "gevent"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+# prometheus_client multiprocess mode; must exist before the app (preloaded in this process) imports prometheus_client
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"btm-prometheus-{os.getenv('PORT', '5000')}"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    """
+    Empties the metrics directory. Files left by an earlier run, or written by
+    the master while preloading the app, would be merged into the workers'.
+    """
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drops a dead worker's live* gauges from the merged metrics."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def _connect_worker(log, worker):
+    """Gives every worker its own MongoClient; clients created before fork must not be shared."""
+    from btm_workout_db_connect import connect_db, prewarm_connections, reset_after_fork
+    from catalogue_replica import start_catalogue_replica
+
+    # btm_workout_db_connect also resets itself through os.register_at_fork; this keeps the hook explicit
+    reset_after_fork()
+    connect_db()
+    # Warm at least one pooled connection per request thread
+    prewarm_connections(int(os.getenv("MONGO_PREWARM_CONNECTIONS", threads)))
+    log.info("Worker %s connected to MongoDB", worker.pid)
+    # Threads do not survive fork, so each worker follows its own change stream (CATALOGUE_REPLICA=1)
+    start_catalogue_replica()
+
+
+def post_fork(server, worker):
+    # A gevent worker monkey-patches only after this hook; sockets and threads
+    # created here would be unpatched, so it connects in post_worker_init instead
+    if worker_class != "gevent":
+        _connect_worker(server.log, worker)
+
+
+def post_worker_init(worker):
+    if worker_class == "gevent":
+        _connect_worker(worker.log, worker)
@@ -0,0 +1,82 @@
+import pytest
+
+import btm_workout_cache
+from btm_workout_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(btm_workout_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_and_set(clock):
+    cache = TTLCache(ttl=10)
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    clock[0] += 10
+    assert cache.get("a") == 1
+    clock[0] += 0.001
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_set_refreshes_the_ttl(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    clock[0] += 8
+    cache.set("a", 2)
+    clock[0] += 8
+    assert cache.get("a") == 2
+
+
+def test_cached_none_is_a_hit(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("a", None)
+    missing = object()
+    assert cache.get("a", missing) is None
+
+
+def test_get_or_load_calls_the_loader_once(clock):
+    cache = TTLCache(ttl=10)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_load("a", loader) == "value"
+    assert cache.get_or_load("a", loader) == "value"
+    assert len(calls) == 1
+    clock[0] += 11
+    cache.get_or_load("a", loader)
+    assert len(calls) == 2
+
+
+def test_stats_and_clear(clock):
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+    cache.clear()
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,38 @@
+import pytest
+
+import flask_server
+from flask_server import build_bulk_delete_query
+
+
+def test_names_use_the_unique_index_prefix():
+    assert build_bulk_delete_query({"names": ["Squat", "Lunge"]}) == {"name": {"$in": ["Squat", "Lunge"]}}
+
+
+def test_filter_strings_and_lists():
+    query = build_bulk_delete_query({"filter": {"bodyPart": "upper legs", "equipment": ["barbell", "dumbbell"]}})
+    assert query == {"bodyPart": "upper legs", "equipment": {"$in": ["barbell", "dumbbell"]}}
+
+
+@pytest.mark.parametrize("data", [
+    {},
+    {"names": ["Squat"], "filter": {"target": "quads"}},
+    {"names": []},
+    {"names": "Squat"},
+    {"names": ["Squat", 3]},
+    {"filter": {}},
+    {"filter": ["target"]},
+    {"filter": {"name": "Squat"}},
+    {"filter": {"target": {"$ne": "quads"}}},
+    {"filter": {"target": []}},
+    {"filter": {"target": ["quads", None]}},
+])
+def test_rejects_invalid_requests(data):
+    with pytest.raises(ValueError):
+        build_bulk_delete_query(data)
+
+
+def test_name_limit(monkeypatch):
+    monkeypatch.setattr(flask_server, "BULK_DELETE_MAX_NAMES", 2)
+    build_bulk_delete_query({"names": ["a", "b"]})
+    with pytest.raises(ValueError, match="At most 2"):
+        build_bulk_delete_query({"names": ["a", "b", "c"]})
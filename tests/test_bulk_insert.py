@@ -0,0 +1,53 @@
+from pymongo.errors import BulkWriteError
+
+from flask_server import DUPLICATE_KEY_ERROR, insert_exercise_batch
+
+
+class FakeExercises:
+    """insert_many(ordered=False) that fails the documents at the given positions."""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.written = []
+
+    def insert_many(self, documents, ordered):
+        write_errors = []
+        for position, document in enumerate(documents):
+            document.setdefault("_id", f"id-{document['name']}")
+            if position in self.errors:
+                write_errors.append(dict(self.errors[position], index=position))
+            else:
+                self.written.append(document)
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors, "nInserted": len(self.written)})
+
+
+def batch_of(*names, start=0):
+    return [(start + i, {"name": name, "bodyPart": "chest"}) for i, name in enumerate(names)]
+
+
+def test_all_inserted():
+    results = []
+    inserted = insert_exercise_batch(FakeExercises(), batch_of("a", "b"), results)
+    assert [e["name"] for e in inserted] == ["a", "b"]
+    assert results == [
+        {"index": 0, "status": "inserted", "id": "id-a"},
+        {"index": 1, "status": "inserted", "id": "id-b"},
+    ]
+
+
+def test_write_errors_map_to_request_indexes():
+    # Write error indexes are positions in this batch; results carry the item's index in the request
+    collection = FakeExercises({
+        1: {"code": DUPLICATE_KEY_ERROR, "errmsg": "E11000 duplicate key"},
+        2: {"code": 121, "errmsg": "Document failed validation"},
+    })
+    results = []
+    inserted = insert_exercise_batch(collection, batch_of("a", "b", "c", "d", start=500), results)
+    assert [e["name"] for e in inserted] == ["a", "d"]
+    assert results == [
+        {"index": 500, "status": "inserted", "id": "id-a"},
+        {"index": 501, "status": "duplicate", "name": "b"},
+        {"index": 502, "status": "error", "error": "Document failed validation"},
+        {"index": 503, "status": "inserted", "id": "id-d"},
+    ]
@@ -0,0 +1,90 @@
+import pytest
+from flask import Flask, jsonify
+from pymongo.errors import PyMongoError
+
+import flask_server
+from btm_workout_cache import CatalogueVersion
+from btm_workout_compression import compress_response
+from flask_server import catalogue_etag
+
+EPOCH = "65f000000000000000000000"
+
+
+@pytest.fixture
+def state(monkeypatch):
+    state = {"db": object(), "version": CatalogueVersion(EPOCH, 1), "calls": 0, "status": 200}
+
+    def get_catalogue_version(db):
+        if isinstance(state["version"], Exception):
+            raise state["version"]
+        return state["version"]
+
+    monkeypatch.setattr(flask_server, "get_db", lambda: state["db"])
+    monkeypatch.setattr(flask_server, "get_catalogue_version", get_catalogue_version)
+    return state
+
+
+@pytest.fixture
+def client(state):
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.route("/list")
+    @catalogue_etag
+    def catalogue_list():
+        state["calls"] += 1
+        # Large enough to be compressed
+        return jsonify(["exercise"] * 1000), state["status"]
+
+    return app.test_client()
+
+
+def test_tags_the_response_with_the_version(client, state):
+    response = client.get("/list")
+    assert response.status_code == 200
+    assert response.get_etag() == (f"{EPOCH}-1", False)
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+
+def test_matching_if_none_match_answers_304_without_running_the_view(client, state):
+    response = client.get("/list", headers={"If-None-Match": f'"{EPOCH}-1"'})
+    assert response.status_code == 304
+    assert response.get_etag() == (f"{EPOCH}-1", False)
+    assert state["calls"] == 0
+
+
+def test_compressed_variant_revalidates_as_the_same_variant(client, state):
+    first = client.get("/list", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.get_etag() == (f"{EPOCH}-1-gzip", False)
+
+    response = client.get("/list", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{EPOCH}-1-gzip"'})
+    assert response.status_code == 304
+    assert response.get_etag() == (f"{EPOCH}-1-gzip", False)
+    assert state["calls"] == 1
+
+
+@pytest.mark.parametrize("tag", [f"{EPOCH}-0", f"{EPOCH}-10", "66f000000000000000000000-1", f"{EPOCH}-1-zstd"])
+def test_other_tags_get_a_full_response(client, state, tag):
+    response = client.get("/list", headers={"If-None-Match": f'"{tag}"'})
+    assert response.status_code == 200
+    assert state["calls"] == 1
+
+
+def test_errors_are_not_tagged(client, state):
+    state["status"] = 500
+    response = client.get("/list")
+    assert response.status_code == 500
+    assert response.get_etag() == (None, None)
+
+
+@pytest.mark.parametrize("failure", ["no_db", "version_error"])
+def test_runs_the_view_untagged_when_the_version_is_unknown(client, state, failure):
+    if failure == "no_db":
+        state["db"] = None
+    else:
+        state["version"] = PyMongoError("boom")
+    response = client.get("/list", headers={"If-None-Match": f'"{EPOCH}-1"'})
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
+    assert state["calls"] == 1
@@ -0,0 +1,75 @@
+import pytest
+from pymongo.errors import PyMongoError
+
+from btm_workout_cache import CATALOGUE_VERSION_ID, CatalogueVersion
+from catalogue_replica import CatalogueReplica
+
+EPOCH = "65f000000000000000000000"
+
+
+def exercise_insert(doc_id, name):
+    doc = {"_id": doc_id, "name": name, "bodyPart": "chest", "equipment": "barbell"}
+    return {"operationType": "insert", "ns": {"coll": "exercises"}, "documentKey": {"_id": doc_id}, "fullDocument": doc}
+
+
+def version_bump(number, looked_up_number):
+    # fullDocument comes from updateLookup: the meta doc as it is when the event is read
+    return {
+        "operationType": "update",
+        "ns": {"coll": "meta"},
+        "documentKey": {"_id": CATALOGUE_VERSION_ID},
+        "updateDescription": {"updatedFields": {"version": number}, "removedFields": []},
+        "fullDocument": {"_id": CATALOGUE_VERSION_ID, "epoch": EPOCH, "version": looked_up_number},
+    }
+
+
+@pytest.fixture
+def replica():
+    replica = CatalogueReplica()
+    replica._version = CatalogueVersion(EPOCH, 5)
+    replica._synced = True
+    return replica
+
+
+def test_version_comes_from_the_event_not_the_looked_up_document(replica):
+    # c1, bump to 6, c3, bump to 7; both bump events are read after the second bump
+    replica._apply(exercise_insert(1, "c1"))
+    replica._apply(version_bump(6, looked_up_number=7))
+    assert replica.ready_for(CatalogueVersion(EPOCH, 6))
+    assert not replica.ready_for(CatalogueVersion(EPOCH, 7))
+
+    replica._apply(exercise_insert(3, "c3"))
+    replica._apply(version_bump(7, looked_up_number=7))
+    assert replica.ready_for(CatalogueVersion(EPOCH, 7))
+    assert replica.find_by_name("c3") is not None
+
+
+def test_other_epoch_or_unsynced_is_not_ready(replica):
+    assert not replica.ready_for(CatalogueVersion("65f000000000000000000001", 5))
+    replica._synced = False
+    assert not replica.ready_for(CatalogueVersion(EPOCH, 5))
+
+
+def test_insert_and_replace_use_the_written_document(replica):
+    replica._apply({"operationType": "replace", "ns": {"coll": "meta"}, "documentKey": {"_id": CATALOGUE_VERSION_ID},
+                    "fullDocument": {"_id": CATALOGUE_VERSION_ID, "epoch": "65f000000000000000000002", "version": 1}})
+    assert replica.ready_for(CatalogueVersion("65f000000000000000000002", 1))
+
+
+def test_deleting_the_version_doc_clears_the_version(replica):
+    replica._apply({"operationType": "delete", "ns": {"coll": "meta"}, "documentKey": {"_id": CATALOGUE_VERSION_ID}})
+    assert not replica.ready_for(CatalogueVersion(EPOCH, 0))
+
+
+def test_other_meta_documents_are_ignored(replica):
+    replica._apply({"operationType": "update", "ns": {"coll": "meta"}, "documentKey": {"_id": "something_else"},
+                    "updateDescription": {"updatedFields": {"version": 99}, "removedFields": []}})
+    assert replica.ready_for(CatalogueVersion(EPOCH, 5))
+    assert not replica.ready_for(CatalogueVersion(EPOCH, 6))
+
+
+def test_epoch_change_by_update_forces_a_resync(replica):
+    change = version_bump(6, looked_up_number=6)
+    change["updateDescription"]["updatedFields"] = {"epoch": "65f000000000000000000003"}
+    with pytest.raises(PyMongoError):
+        replica._apply(change)
@@ -0,0 +1,35 @@
+import gzip
+import json
+
+import catalogue_snapshot
+from catalogue_snapshot import build_snapshot, snapshot_path
+from btm_workout_cache import CatalogueVersion
+
+
+class FakeExercises:
+    def find(self, query, projection, batch_size=None):
+        return [{"name": "squat", "bodyPart": "upper legs"}, {"name": "push up", "bodyPart": "chest"}]
+
+
+class FakeDB:
+    name = "btm_test"
+    exercises = FakeExercises()
+
+
+def test_gzip_snapshot_header_has_no_file_name_or_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalogue_snapshot, "CATALOGUE_SNAPSHOT_DIR", str(tmp_path))
+    version = CatalogueVersion("65f000000000000000000000", 3)
+    build_snapshot(FakeDB(), version, json.dumps)
+
+    data = open(snapshot_path("btm_test", version, "gzip"), "rb").read()
+    flags, mtime = data[3], data[4:8]
+    assert not flags & 0x08  # FNAME
+    assert mtime == b"\0\0\0\0"
+    assert b"tmp-" not in data
+    assert json.loads(gzip.decompress(data)) == json.loads(open(snapshot_path("btm_test", version), "rb").read())
+
+
+def test_snapshots_are_named_per_database_and_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalogue_snapshot, "CATALOGUE_SNAPSHOT_DIR", str(tmp_path))
+    version = CatalogueVersion("65f000000000000000000000", 3)
+    assert snapshot_path("btm_test", version, "br").endswith("catalogue.btm_test.v65f000000000000000000000-3.json.br")
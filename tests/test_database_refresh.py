@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+import database_refresh
+from database_refresh import map_api_exercise, upsert_exercises
+
+
+def exercise(name, body_part="chest", equipment="barbell", **fields):
+    return map_api_exercise(dict({"name": name, "bodyPart": body_part, "equipment": equipment, "target": "pecs"}, **fields))
+
+
+class FakeExercises:
+    """Stores documents by (name, bodyPart, equipment) and applies UpdateOne upserts."""
+
+    def __init__(self, docs=()):
+        self.docs = {(d["name"], d["bodyPart"], d["equipment"]): dict(d) for d in docs}
+        self.batches = []
+
+    def find(self, query, projection):
+        return [dict(doc) for doc in self.docs.values()]
+
+    def bulk_write(self, operations, ordered):
+        self.batches.append(len(operations))
+        upserted = modified = 0
+        for op in operations:
+            key = (op._filter["name"], op._filter["bodyPart"], op._filter["equipment"])
+            new = op._doc["$set"]
+            if key not in self.docs:
+                upserted += 1
+                self.docs[key] = dict(new)
+            elif self.docs[key] != new:
+                modified += 1
+                self.docs[key] = dict(new)
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+
+@pytest.fixture(autouse=True)
+def invalidations(monkeypatch):
+    calls = []
+    monkeypatch.setattr(database_refresh, "invalidate_exercise_caches", lambda: calls.append(1))
+    return calls
+
+
+def test_counts_inserted_updated_unchanged_and_skipped(invalidations):
+    collection = FakeExercises([exercise("bench press"), exercise("push up", equipment="body weight")])
+    stats = upsert_exercises(collection, [
+        exercise("bench press"),  # unchanged
+        exercise("push up", equipment="body weight", target="triceps"),  # updated
+        exercise("squat", body_part="upper legs"),  # inserted
+        exercise("squat", body_part="upper legs"),  # repeated in the feed, not sent again
+        exercise(None),  # no key
+    ], batch_size=10)
+    assert stats == {"inserted": 1, "updated": 1, "unchanged": 2, "skipped": 1}
+    assert collection.batches == [2]
+    assert invalidations == [1]
+
+
+def test_writes_in_batches_and_reports_progress(invalidations):
+    collection = FakeExercises()
+    progress = []
+    stats = upsert_exercises(collection, [exercise(f"e{i}") for i in range(5)], batch_size=2,
+                             progress=lambda phase, processed: progress.append((phase, processed)))
+    assert stats["inserted"] == 5
+    assert collection.batches == [2, 2, 1]
+    assert len(invalidations) == 3
+    assert progress[-1] == ("writing", 5)
+
+
+def test_nothing_to_write_sends_no_batch(invalidations):
+    collection = FakeExercises([exercise("bench press")])
+    stats = upsert_exercises(collection, [exercise("bench press")])
+    assert stats == {"inserted": 0, "updated": 0, "unchanged": 1, "skipped": 0}
+    assert collection.batches == []
+    assert invalidations == []
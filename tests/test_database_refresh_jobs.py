@@ -0,0 +1,99 @@
+import time
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import database_refresh_jobs
+from database_refresh_jobs import REFRESH_JOB_STALE_SECONDS, get_refresh_job, start_refresh_job
+
+
+class FakeJobs:
+    """refresh_jobs with the one_active_refresh partial unique index."""
+
+    def __init__(self):
+        self.docs = {}
+        # Jobs that finish between a failed insert and the lookup of the active job
+        self.finish_before_lookup = 0
+
+    def create_index(self, keys, **options):
+        pass
+
+    def _active(self):
+        return next((doc for doc in self.docs.values() if doc.get("active") is True), None)
+
+    def insert_one(self, doc):
+        if doc.get("active") is True and self._active() is not None:
+            raise DuplicateKeyError("E11000 duplicate key error index: one_active_refresh")
+        self.docs[doc["_id"]] = dict(doc)
+
+    def find_one(self, query):
+        if query == {"active": True}:
+            if self.finish_before_lookup:
+                self.finish_before_lookup -= 1
+                self._active().pop("active")
+            doc = self._active()
+        else:
+            doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None else None
+
+    def update_one(self, query, update):
+        doc = self.docs[query["_id"]]
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__(refresh_jobs=FakeJobs())
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(database_refresh_jobs, "get_db", lambda: db)
+    monkeypatch.setattr(database_refresh_jobs, "_indexes_ready", False)
+    # The refresh itself is not run; the job stays queued
+    monkeypatch.setattr(database_refresh_jobs, "_run_job", lambda jobs, job_id: None)
+    return db["refresh_jobs"]
+
+
+def test_second_start_returns_the_active_job(jobs):
+    job, created = start_refresh_job()
+    again, created_again = start_refresh_job()
+    assert created and not created_again
+    assert again.id == job.id
+    assert len(jobs.docs) == 1
+    assert get_refresh_job(job.id).to_dict()["status"] == "queued"
+
+
+def test_finished_job_frees_the_slot(jobs):
+    job, _ = start_refresh_job()
+    database_refresh_jobs._finish(jobs, job.id, {"status": "succeeded"})
+    new_job, created = start_refresh_job()
+    assert created and new_job.id != job.id
+
+
+def test_job_that_finishes_during_the_lookup_is_retried(jobs):
+    start_refresh_job()
+    jobs.finish_before_lookup = 1
+    _, created = start_refresh_job()
+    assert created
+    assert len(jobs.docs) == 2
+
+
+def test_stale_job_is_failed_and_replaced(jobs):
+    stale, _ = start_refresh_job()
+    jobs.docs[stale.id]["heartbeat_at"] = time.time() - REFRESH_JOB_STALE_SECONDS - 1
+    job, created = start_refresh_job()
+    assert created and job.id != stale.id
+    failed = get_refresh_job(stale.id).to_dict()
+    assert failed["status"] == "failed"
+    assert "active" not in jobs.docs[stale.id]
+    assert jobs._active()["_id"] == job.id
+
+
+def test_no_database(monkeypatch):
+    monkeypatch.setattr(database_refresh_jobs, "get_db", lambda: None)
+    with pytest.raises(RuntimeError):
+        start_refresh_job()
@@ -0,0 +1,99 @@
+import pytest
+
+from btm_workout_cache import CATALOGUE_VERSION_ID
+from exercise_autocomplete import NameIndex, normalize_name
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query=None, projection=None):
+        return [dict(doc) for doc in self.docs]
+
+    def find_one(self, query):
+        return next((dict(doc) for doc in self.docs if doc["_id"] == query["_id"]), None)
+
+
+class FakeDB:
+    """Just enough of a pymongo Database for NameIndex.reload."""
+
+    def __init__(self, names):
+        self.exercises = FakeCollection([{"name": name} for name in names])
+        self.meta = FakeCollection([{"_id": CATALOGUE_VERSION_ID, "epoch": "test", "version": 1}])
+
+
+NAMES = [
+    "barbell curl",
+    "Barbell Bench Press",
+    "dumbbell curl",
+    "hammer curl",
+    "push up",
+    "90 degree heel touch",
+    "barbell curl",  # same name with other bodyPart/equipment
+]
+
+
+@pytest.fixture
+def db():
+    return FakeDB(NAMES)
+
+
+@pytest.fixture
+def index(db):
+    index = NameIndex(min_similarity=0.5)
+    index.reload(db)
+    return index
+
+
+def test_normalize_name():
+    assert normalize_name("  Barbell   BENCH press ") == "barbell bench press"
+
+
+def test_whole_name_prefix(index, db):
+    assert index.complete(db, "bar") == ["Barbell Bench Press", "barbell curl"]
+
+
+def test_prefix_is_normalized(index, db):
+    assert index.complete(db, "BARBELL  b") == ["Barbell Bench Press"]
+
+
+def test_later_word_prefix(index, db):
+    assert index.complete(db, "curl") == ["barbell curl", "dumbbell curl", "hammer curl"]
+
+
+def test_limit(index, db):
+    assert index.complete(db, "curl", limit=2) == ["barbell curl", "dumbbell curl"]
+
+
+def test_misspelt_words_are_corrected(index, db):
+    assert index.complete(db, "barbel cur") == ["barbell curl"]
+    assert index.complete(db, "dumbel") == ["dumbbell curl"]
+
+
+def test_numbers_are_not_corrected(index, db):
+    assert index.complete(db, "9") == ["90 degree heel touch"]
+    assert index.complete(db, "91 deg") == []
+
+
+def test_no_match_and_empty_prefix(index, db):
+    assert index.complete(db, "xyz") == []
+    assert index.complete(db, "   ") == []
+
+
+def test_add_and_remove_are_incremental(index, db):
+    index.add("cable curl")
+    assert index.complete(db, "curl") == ["barbell curl", "cable curl", "dumbbell curl", "hammer curl"]
+    assert index.complete(db, "cabel") == ["cable curl"]
+
+    # "barbell curl" was loaded twice; it stays until both copies are removed
+    index.remove("barbell curl")
+    assert index.complete(db, "barbell c") == ["barbell curl"]
+    index.remove("barbell curl")
+    assert index.complete(db, "barbell c") == []
+
+
+def test_add_before_the_first_load_is_ignored(db):
+    index = NameIndex()
+    index.add("cable curl")
+    assert not index.loaded()
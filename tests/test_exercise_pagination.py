@@ -0,0 +1,80 @@
+import pytest
+
+from exercise_pagination import EXERCISE_KEY_FIELDS, decode_exercise_cursor, encode_exercise_cursor, exercise_keyset_filter
+
+
+def sort_key(exercise):
+    # MongoDB orders missing/null before strings
+    return tuple((exercise.get(field) is not None, exercise.get(field) or "") for field in EXERCISE_KEY_FIELDS)
+
+
+def matches(exercise, query):
+    """Evaluates the subset of the query language exercise_keyset_filter produces."""
+    if "$or" in query:
+        return any(matches(exercise, clause) for clause in query["$or"])
+    for field, condition in query.items():
+        value = exercise.get(field)
+        if isinstance(condition, dict):
+            if "$gt" in condition and (value is None or not value > condition["$gt"]):
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+CATALOGUE = sorted([
+    {"name": "curl", "bodyPart": "upper arms", "equipment": "barbell"},
+    {"name": "curl", "bodyPart": "upper arms", "equipment": "dumbbell"},
+    {"name": "curl", "bodyPart": "upper arms", "equipment": None},
+    {"name": "curl", "bodyPart": "forearms", "equipment": "cable"},
+    {"name": "curl", "bodyPart": None, "equipment": "band"},
+    {"name": "press", "bodyPart": "chest", "equipment": "barbell"},
+    {"name": "push up", "bodyPart": "chest", "equipment": "body weight"},
+    {"name": None, "bodyPart": "chest", "equipment": "machine"},
+], key=sort_key)
+
+
+def test_filter_shape():
+    assert exercise_keyset_filter(["curl", "upper arms", "barbell"]) == {"$or": [
+        {"name": {"$gt": "curl"}},
+        {"name": "curl", "bodyPart": {"$gt": "upper arms"}},
+        {"name": "curl", "bodyPart": "upper arms", "equipment": {"$gt": "barbell"}},
+    ]}
+
+
+def test_null_key_values_mean_not_null():
+    assert exercise_keyset_filter(["curl", None, None])["$or"][1:] == [
+        {"name": "curl", "bodyPart": {"$ne": None}},
+        {"name": "curl", "bodyPart": None, "equipment": {"$ne": None}},
+    ]
+
+
+@pytest.mark.parametrize("position", range(len(CATALOGUE)))
+def test_filter_selects_exactly_the_documents_after_the_cursor(position):
+    key = decode_exercise_cursor(encode_exercise_cursor(CATALOGUE[position]))
+    query = exercise_keyset_filter(key)
+    assert [e for e in CATALOGUE if matches(e, query)] == CATALOGUE[position + 1:]
+
+
+def test_walking_pages_visits_every_document_once():
+    page_size, seen, query = 3, [], {}
+    while True:
+        page = [e for e in CATALOGUE if matches(e, query)][:page_size]
+        if not page:
+            break
+        seen.extend(page)
+        query = exercise_keyset_filter(decode_exercise_cursor(encode_exercise_cursor(page[-1])))
+    assert seen == CATALOGUE
+
+
+def test_cursor_round_trip_keeps_only_the_key_fields():
+    exercise = {"name": "curl", "bodyPart": "upper arms", "equipment": "barbell", "target": "biceps"}
+    assert decode_exercise_cursor(encode_exercise_cursor(exercise)) == ["curl", "upper arms", "barbell"]
+
+
+@pytest.mark.parametrize("token", ["not base64!", "bm90IGpzb24=", "WyJjdXJsIl0="])  # garbage, "not json", ["curl"]
+def test_malformed_cursor_raises_value_error(token):
+    with pytest.raises(ValueError):
+        decode_exercise_cursor(token)
@@ -0,0 +1,111 @@
+import pytest
+
+import btm_workout_cache
+from btm_workout_cache import CATALOGUE_VERSION_ID, CatalogueVersion
+from exercise_sampler import ExerciseSampler
+
+EPOCH = "65f000000000000000000000"
+
+
+class FakeExercises:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        if "_id" in query:
+            return [dict(doc) for doc in self.docs if doc["_id"] in query["_id"]["$in"]]
+        return [dict(doc) for doc in self.docs if "bodyPart" in doc]
+
+    def aggregate(self, pipeline):
+        body_part = pipeline[0]["$match"]["bodyPart"]
+        size = pipeline[1]["$sample"]["size"]
+        return [{k: v for k, v in doc.items() if k != "_id"} for doc in self.docs if doc.get("bodyPart") == body_part][:size]
+
+
+class FakeMeta:
+    def __init__(self):
+        self.version = 1
+
+    def find_one(self, query):
+        return {"_id": CATALOGUE_VERSION_ID, "epoch": EPOCH, "version": self.version}
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.exercises = FakeExercises(docs)
+        self.meta = FakeMeta()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # Read the version from the fake meta doc on every call
+    monkeypatch.setattr(btm_workout_cache, "CATALOGUE_VERSION_TTL", 0)
+    monkeypatch.setattr(btm_workout_cache, "_catalogue_version", None)
+    return FakeDB([
+        {"_id": 1, "name": "bench press", "bodyPart": "chest"},
+        {"_id": 2, "name": "push up", "bodyPart": "chest"},
+        {"_id": 3, "name": "squat", "bodyPart": "upper legs"},
+    ])
+
+
+@pytest.fixture
+def sampler(db, monkeypatch):
+    sampler = ExerciseSampler()
+    sampler.reloads = 0
+    loaded = sampler.load
+
+    def counting_load(db):
+        sampler.reloads += 1
+        loaded(db)
+
+    monkeypatch.setattr(sampler, "load", counting_load)
+    # Run "background" reloads inline so the test can observe them
+    monkeypatch.setattr(sampler, "_reload_in_background", sampler.reload)
+    sampler.sample(db, "chest", 1)
+    return sampler
+
+
+def test_samples_distinct_exercises_of_the_body_part(sampler, db):
+    exercises = sampler.sample(db, "chest", 5)
+    assert sorted(e["name"] for e in exercises) == ["bench press", "push up"]
+    assert all("_id" not in e for e in exercises)
+
+
+def test_own_writes_do_not_reload(sampler, db):
+    for doc_id in (10, 11, 12):
+        db.exercises.docs.append({"_id": doc_id, "name": f"fly {doc_id}", "bodyPart": "chest"})
+        db.meta.version += 1
+        sampler.add(doc_id, "chest", CatalogueVersion(EPOCH, db.meta.version))
+        assert len(sampler.sample(db, "chest", 10)) == 2 + doc_id - 9
+
+    db.meta.version += 1
+    sampler.remove(10, "chest", CatalogueVersion(EPOCH, db.meta.version))
+    sampler.sample(db, "chest", 10)
+    assert sampler.reloads == 1
+
+
+def test_other_workers_writes_reload(sampler, db):
+    db.exercises.docs.append({"_id": 10, "name": "fly", "bodyPart": "chest"})
+    db.meta.version += 1
+    assert len(sampler.sample(db, "chest", 10)) == 3
+    assert sampler.reloads == 2
+
+
+def test_add_skipping_a_version_reloads(sampler, db):
+    # Another worker's bump landed between this index's version and ours
+    db.meta.version += 2
+    sampler.add(10, "chest", CatalogueVersion(EPOCH, db.meta.version))
+    sampler.sample(db, "chest", 1)
+    assert sampler.reloads == 2
+
+
+def test_new_body_part_falls_back_to_mongodb_while_stale(sampler, db, monkeypatch):
+    db.exercises.docs.append({"_id": 10, "name": "plank", "bodyPart": "waist"})
+    db.meta.version += 1
+    # The background reload has not finished yet
+    monkeypatch.setattr(sampler, "_reload_in_background", lambda db: None)
+    assert sampler.sample(db, "waist", 2) == [{"name": "plank", "bodyPart": "waist"}]
+
+
+def test_unknown_body_part_when_current_is_empty(sampler, db):
+    assert sampler.sample(db, "waist", 2) == []
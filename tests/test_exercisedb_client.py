@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from exercisedb_client import ExerciseDBFormatError, iter_json_array
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+EXERCISES = [
+    {"name": "barbell curl", "bodyPart": "upper arms", "instructions": ["Curl [slowly], then lower."]},
+    {"name": "push-up élévation", "bodyPart": "chest", "secondaryMuscles": []},
+    {"name": "squat", "bodyPart": "upper legs", "nested": {"a": [1, 2, {"b": "]"}]}},
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 10_000])
+def test_yields_every_element_whatever_the_chunk_size(size):
+    data = json.dumps(EXERCISES, ensure_ascii=False).encode()
+    assert list(iter_json_array(chunked(data, size))) == EXERCISES
+
+
+def test_multibyte_characters_split_across_chunks():
+    data = json.dumps([{"name": "éè中"}], ensure_ascii=False).encode()
+    assert list(iter_json_array(chunked(data, 1))) == [{"name": "éè中"}]
+
+
+def test_whitespace_between_elements():
+    data = b'  \n[ 1 ,\n 2,\t"three" ,  {"four": 4} ]  \n'
+    assert list(iter_json_array(chunked(data, 3))) == [1, 2, "three", {"four": 4}]
+
+
+def test_empty_array():
+    assert list(iter_json_array([b"[", b"]"])) == []
+
+
+def test_leading_empty_chunks_are_skipped():
+    assert list(iter_json_array([b"", b"  ", b"[1]"])) == [1]
+
+
+@pytest.mark.parametrize("payload", [b'{"message": "Too many requests"}', b'"error"', b"null"])
+def test_non_array_payload_raises(payload):
+    with pytest.raises(ExerciseDBFormatError):
+        list(iter_json_array([payload]))
+
+
+def test_truncated_array_raises_after_the_complete_elements():
+    items = iter_json_array([b'[{"a": 1}, {"b"', b": 2"])
+    assert next(items) == {"a": 1}
+    with pytest.raises(ExerciseDBFormatError):
+        next(items)
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    ([b"[1, 12", b"3]"], [1, 123]),
+    ([b"[1.5", b"e2, -", b"7]"], [150.0, -7]),
+    ([b'[{"a": 1}, tr', b"ue]"], [{"a": 1}, True]),
+    ([b"[nu", b"ll, fals", b"e]"], [None, False]),
+    ([b'[{"a": 1}', b"]"], [{"a": 1}]),
+])
+def test_scalars_split_across_chunks_are_joined(chunks, expected):
+    assert list(iter_json_array(chunks)) == expected
+
+
+def test_every_split_point_of_a_scalar_array():
+    data = b"[10, 200, 3000, true, null, -4.25]"
+    for split in range(1, len(data)):
+        assert list(iter_json_array([data[:split], data[split:]])) == [10, 200, 3000, True, None, -4.25]
+
+
+def test_garbage_after_an_element_raises():
+    with pytest.raises(ExerciseDBFormatError):
+        list(iter_json_array([b'[{"a": 1}x, 2]']))